@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
-from data.mock_shipments import generate_mock_data
 from datetime import datetime
-from utils.export_utils import generate_csv_download_link, generate_pdf_report, parse_uploaded_csv
-from utils.weather_utils import get_route_weather
+from utils.export_utils import EXPORT_FORMATS, export_shipments, import_uploaded_csv, submit_pdf_report, validate_csv_header
+from utils.data_utils import shipment_filter_mask
+from utils.weather_utils import get_route_weather, get_weather_for_cities
+from utils.geo_utils import get_city_registry
+from data.shipment_store import STATUSES, SessionShipments, compact_shipments, ensure_session_shipments, get_shipment_store
+from data.refresh_worker import get_refresh_worker
+from utils.instrumentation import script_run
 # Notification functionality has been removed
 
 st.set_page_config(
@@ -18,18 +22,18 @@ def create_new_shipment():
     st.session_state.shipment_created = False
 
 def refresh_data():
-    st.session_state.shipment_data = generate_mock_data()
-    st.session_state.last_refresh = datetime.now()
-    st.success("Data refreshed successfully!")
+    get_refresh_worker().request_refresh()
+    # Drop local edits so this session follows the next published snapshot
+    st.session_state.shipments = SessionShipments(get_shipment_store())
+    st.success("Refresh started; new data appears as soon as it is ready.")
 
 def main():
     st.title("🚚 Smart Logistics Platform")
 
-    # Initialize session state
-    if 'shipment_data' not in st.session_state:
-        st.session_state.shipment_data = generate_mock_data()
-    if 'last_refresh' not in st.session_state:
-        st.session_state.last_refresh = datetime.now()
+    # Initialize session state; the shipment table is shared across sessions
+    # and refreshed in the background
+    refresh_worker = get_refresh_worker()
+    shipments = ensure_session_shipments(st.session_state)
     if 'show_new_shipment' not in st.session_state:
         st.session_state.show_new_shipment = False
 
@@ -37,36 +41,95 @@ def main():
     st.sidebar.subheader("📤 Batch Operations")
     uploaded_file = st.sidebar.file_uploader("Upload Shipments CSV", type="csv")
     if uploaded_file is not None:
-        df, error = parse_uploaded_csv(uploaded_file)
+        error = validate_csv_header(uploaded_file)
         if error:
             st.sidebar.error(error)
         else:
             if st.sidebar.button("Process Uploaded Shipments"):
-                st.session_state.shipment_data = pd.concat([df, st.session_state.shipment_data], ignore_index=True)
-                st.sidebar.success(f"Added {len(df)} new shipments!")
+                progress_bar = st.sidebar.progress(0.0)
+                # Staged in the compact schema, so an upload that fails part-way
+                # adds nothing and no raw string chunk outlives its parse
+                staged = []
+                summary = import_uploaded_csv(
+                    uploaded_file, lambda rows: staged.append(compact_shipments(rows)),
+                    progress=progress_bar.progress
+                )
+                if summary['fatal']:
+                    st.sidebar.error(summary['fatal'])
+                else:
+                    for rows in staged:
+                        st.session_state.shipments.append(rows)
+                    st.sidebar.success(f"Added {summary['rows_imported']} new shipments!")
+                if summary['errors']:
+                    st.sidebar.warning(
+                        f"Skipped {summary['rows_read'] - summary['rows_imported']} invalid rows"
+                    )
+                    st.sidebar.dataframe(
+                        pd.DataFrame(summary['errors'][:20], columns=['line', 'error']),
+                        hide_index=True
+                    )
 
     # Export Options
-    export_format = st.sidebar.selectbox("Export Format", ["CSV", "PDF"])
+    export_format = st.sidebar.selectbox("Export Format", list(EXPORT_FORMATS) + ["PDF"])
+    export_columns = st.sidebar.multiselect(
+        "Export Columns",
+        options=shipments.columns,
+        default=shipments.columns
+    )
+    export_status = st.sidebar.selectbox("Export Status", ["All"] + STATUSES)
     if st.sidebar.button("Export Data"):
-        if export_format == "CSV":
-            href = generate_csv_download_link(st.session_state.shipment_data)
-            st.sidebar.markdown(f'<a href="{href}" download="shipments.csv">Download CSV</a>', unsafe_allow_html=True)
-        else:
-            pdf_html = generate_pdf_report(st.session_state.shipment_data)
-            st.sidebar.download_button(
-                "Download PDF",
-                pdf_html,
-                "shipments.pdf",
-                "text/html"
+        # The only place the session's full table is materialized
+        export_data = st.session_state.shipments.frame()
+        if export_format in EXPORT_FORMATS:
+            mask = shipment_filter_mask(
+                export_data,
+                status=None if export_status == "All" else export_status
             )
+            with st.spinner("Exporting shipments..."):
+                path, mime = export_shipments(
+                    export_data,
+                    export_format,
+                    columns=export_columns,
+                    mask=mask
+                )
+            with open(path, 'rb') as f:
+                st.sidebar.download_button(
+                    f"Download {export_format}",
+                    f,
+                    f"shipments{EXPORT_FORMATS[export_format][0]}",
+                    mime
+                )
+        else:
+            # Rendered in a background worker; picked up on a later rerun
+            st.session_state.pdf_report = submit_pdf_report(export_data)
+
+    pdf_report = st.session_state.get('pdf_report')
+    if pdf_report is not None:
+        if pdf_report.done():
+            try:
+                path = pdf_report.result()
+            except Exception as e:
+                # Forget the failed job so the next export can start a new one
+                st.sidebar.error(f"PDF report failed: {e}")
+                del st.session_state.pdf_report
+            else:
+                with open(path, 'rb') as f:
+                    st.sidebar.download_button(
+                        "Download PDF",
+                        f,
+                        "shipments.pdf",
+                        "application/pdf"
+                    )
+        else:
+            st.sidebar.info("PDF report is being generated...")
+            st.sidebar.button("Check Report Status")
 
     # Dashboard Overview
     col1, col2, col3 = st.columns(3)
+    kpis = st.session_state.shipments.kpis()
 
     with col1:
-        active_shipments = len(st.session_state.shipment_data[
-            st.session_state.shipment_data['status'] != 'Delivered'
-        ])
+        active_shipments = kpis['active_shipments']
         st.metric(
             label="Active Shipments",
             value=active_shipments,
@@ -74,9 +137,7 @@ def main():
         )
 
     with col2:
-        on_time_rate = (len(st.session_state.shipment_data[
-            st.session_state.shipment_data['predicted_delay'] < 2
-        ]) / len(st.session_state.shipment_data) * 100)
+        on_time_rate = kpis['on_time_rate']
         st.metric(
             label="On-Time Delivery Rate",
             value=f"{on_time_rate:.1f}%",
@@ -84,7 +145,7 @@ def main():
         )
 
     with col3:
-        avg_delay = st.session_state.shipment_data['predicted_delay'].mean()
+        avg_delay = kpis['avg_delay']
         st.metric(
             label="Average Delay",
             value=f"{avg_delay:.1f} hours",
@@ -93,7 +154,11 @@ def main():
 
     # Recent Shipments Table with Weather Info
     st.subheader("Recent Shipments")
-    recent_shipments = st.session_state.shipment_data.head(5)
+    recent_shipments = st.session_state.shipments.newest(5)
+    # One lookup per distinct city, fetched concurrently and cached across reruns
+    route_weather = get_weather_for_cities(
+        pd.concat([recent_shipments['origin'], recent_shipments['destination']])
+    )
 
     for _, shipment in recent_shipments.iterrows():
         with st.expander(f"Shipment {shipment['shipment_id']}"):
@@ -106,7 +171,7 @@ def main():
 
             with col2:
                 # Get real-time weather data
-                weather_info = get_route_weather(shipment['origin'], shipment['destination'])
+                weather_info = get_route_weather(shipment['origin'], shipment['destination'], route_weather)
                 st.write("📍 Origin Weather:", weather_info['origin']['weather']['condition'])
                 st.write("🎯 Destination Weather:", weather_info['destination']['weather']['condition'])
                 if weather_info['route_risk']['risk_level'] != 'Low':
@@ -124,8 +189,15 @@ def main():
         if st.button("🔄 Refresh Data", on_click=refresh_data):
             pass
 
-    # Show last refresh time
-    st.caption(f"Last updated: {st.session_state.last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
+    # Show when the snapshot this session reads was produced
+    st.caption(
+        f"Last updated: {shipments.store.refreshed_at.strftime('%Y-%m-%d %H:%M:%S')} "
+        f"(version {shipments.store.version})"
+    )
+    if refresh_worker.running:
+        st.caption("Refreshing in the background...")
+    elif refresh_worker.last_error:
+        st.caption(f"Last refresh failed: {refresh_worker.last_error}")
     
     # New Shipment Form
     if st.session_state.show_new_shipment:
@@ -135,13 +207,13 @@ def main():
             with col1:
                 origin = st.selectbox(
                     "Origin",
-                    options=['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
+                    options=get_city_registry().names
                 )
                 departure_time = st.time_input("Departure Time")
             with col2:
                 destination = st.selectbox(
                     "Destination",
-                    options=['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
+                    options=get_city_registry().names
                 )
                 weather = st.selectbox(
                     "Weather Condition",
@@ -149,9 +221,8 @@ def main():
                 )
 
             if st.form_submit_button("Create Shipment"):
-                # Add new shipment to the data
+                # Add new shipment to the data; the log allocates a unique ID
                 new_data = pd.DataFrame({
-                    'shipment_id': [f'SHP{len(st.session_state.shipment_data):06d}'],
                     'origin': [origin],
                     'destination': [destination],
                     'status': ['Processing'],
@@ -159,14 +230,12 @@ def main():
                     'weather_condition': [weather],
                     'predicted_delay': [0.0]
                 })
-                st.session_state.shipment_data = pd.concat(
-                    [new_data, st.session_state.shipment_data],
-                    ignore_index=True
-                )
+                st.session_state.shipments.append(new_data)
 
                 st.success("New shipment created successfully!")
                 st.session_state.show_new_shipment = False
                 st.session_state.shipment_created = True
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with script_run('app', st.session_state):
+        main()
@@ -0,0 +1,282 @@
+"""
+Benchmarks for the platform's hot paths on seeded synthetic shipments.
+
+    python -m benchmarks.run                      # all cases at 1k, 100k and 1M rows
+    python -m benchmarks.run --sizes 1000 100000 --cases map csv_parse
+    python -m benchmarks.run --save-baseline      # record benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Each case reports the best wall time over its repeats and the peak
+traced allocation of one extra run. With --baseline, cases slower or
+larger than the baseline by more than --tolerance are re-run once, and
+those still beyond it are listed as regressions with exit status 1.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.mock_shipments import CITIES, generate_mock_data
+from data.shipment_store import compact_shipments
+from utils.data_utils import calculate_performance_metrics, filter_shipments, get_weather_impact
+from utils.export_utils import generate_csv_download_link, parse_uploaded_csv
+from utils.metrics_engine import ShipmentCube
+from utils.ml_utils import DelayPredictor, calculate_distance, optimize_route
+from utils.viz_utils import create_shipment_map
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results', 'latest.json')
+SIZES = [1_000, 100_000, 1_000_000]
+SEED = 42
+BENCH_NOW = pd.Timestamp('2025-01-15 12:00:00')  # Fixed, so datasets are identical across runs
+TRAINING_ROWS = 1000  # Matches the registry's default training set
+REPEAT = 5
+SLOW_SECONDS = 2.0  # Cases slower than this run once
+TOLERANCE = 0.5  # Shared machines vary by a third between runs
+# Differences below these are noise, never regressions; timer and scheduler
+# jitter alone can multiply a sub-10 ms case several times over
+MIN_SECONDS_DELTA = 0.010
+MIN_MB_DELTA = 1.0
+
+class Case:
+    """One benchmark: setup(data) builds the arguments, run(*args) is timed
+
+    max_rows caps the dataset for cases too slow at full size; sized=False
+    cases do not depend on the dataset and run once per suite.
+    """
+
+    def __init__(self, name, run, setup=None, max_rows=None, sized=True):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda data: (data,))
+        self.max_rows = max_rows
+        self.sized = sized
+
+def _csv_upload(data):
+    buffer = io.BytesIO(data.to_csv(index=False).encode())
+    buffer.size = len(buffer.getvalue())
+    return (buffer,)
+
+def _trained_predictor(data):
+    predictor = DelayPredictor()
+    predictor.fit(generate_mock_data(TRAINING_ROWS, seed=SEED, now=BENCH_NOW))
+    return predictor, data
+
+def _render_map(data):
+    return create_shipment_map(data).get_root().render()
+
+def _analytics_rollups(cube):
+    # The rollups pages/4_analytics.py and pages/3_route_optimization.py draw
+    for dimensions in (['day'], ['weather_condition'], ['origin', 'destination']):
+        cube.rollup(dimensions)
+
+def _distances(pairs):
+    for origin, destination in pairs:
+        calculate_distance(origin, destination)
+
+CASES = [
+    Case('fit', lambda data: DelayPredictor().fit(data), max_rows=100_000),
+    Case('predict_delay', lambda predictor, data: predictor.predict_delay(data), setup=_trained_predictor),
+    Case('performance_metrics', calculate_performance_metrics),
+    Case('filter_shipments', lambda data: filter_shipments(
+        data, status='In Transit', date_range=(BENCH_NOW - pd.Timedelta(days=1), BENCH_NOW)
+    )),
+    Case('weather_impact', get_weather_impact),
+    Case('analytics_cube_build', ShipmentCube.from_frame),
+    Case('analytics_rollups', _analytics_rollups, setup=lambda data: (ShipmentCube.from_frame(data),)),
+    Case('map', _render_map),
+    Case('csv_parse', parse_uploaded_csv, setup=_csv_upload),
+    Case('csv_download_link', generate_csv_download_link, max_rows=100_000),
+    Case('optimize_route_greedy', lambda: optimize_route(CITIES[0], CITIES[1], CITIES[2:]),
+         setup=lambda data: (), sized=False),
+    Case('optimize_route_local_search', lambda: optimize_route(
+        CITIES[0], CITIES[1], CITIES[2:], solver='local_search', time_budget=1.0
+    ), setup=lambda data: (), sized=False),
+    Case('calculate_distance_10k', _distances, setup=lambda data: ([
+        (CITIES[i % len(CITIES)], CITIES[(i * 7 + 3) % len(CITIES)]) for i in range(10_000)
+    ],), sized=False),
+]
+
+def _cpu_model():
+    """Processor name, for telling apart baselines taken on different hardware"""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def dataset(n_rows):
+    """Seeded shipments in the store's compact schema"""
+    return compact_shipments(generate_mock_data(n_rows, seed=SEED, now=BENCH_NOW))
+
+def measure(case, data, repeat=REPEAT, memory=True):
+    """Best-of-repeat seconds and traced peak MB for one case"""
+    timings = []
+    for _ in range(repeat):
+        args = case.setup(data)
+        start = time.perf_counter()
+        case.run(*args)
+        timings.append(time.perf_counter() - start)
+        if timings[-1] > SLOW_SECONDS:
+            break
+
+    peak_mb = None
+    if memory:
+        args = case.setup(data)
+        tracemalloc.start()
+        try:
+            case.run(*args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return min(timings), peak_mb
+
+def run_suite(sizes=SIZES, names=None, repeat=REPEAT, memory=True, log=print):
+    """Run the selected cases at each size; returns the results document"""
+    cases = [case for case in CASES if names is None or case.name in names]
+    results = []
+
+    def record(case, rows, data):
+        seconds, peak_mb = measure(case, data, repeat, memory)
+        results.append({'case': case.name, 'rows': rows, 'seconds': seconds, 'peak_mb': peak_mb})
+        memory_text = '' if peak_mb is None else f'  {peak_mb:10.1f} MB'
+        log(f"{case.name:30s} {rows if rows is not None else '-':>9}  {seconds:9.4f} s{memory_text}")
+
+    for case in cases:
+        if not case.sized:
+            record(case, None, None)
+
+    measured = set()
+    for n_rows in sizes:
+        data = dataset(n_rows)
+        for case in cases:
+            rows = min(n_rows, case.max_rows or n_rows)
+            # A capped case already run at its cap has nothing new to measure
+            if case.sized and (case.name, rows) not in measured:
+                measured.add((case.name, rows))
+                record(case, rows, data if rows == n_rows else data.iloc[:rows])
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu': _cpu_model(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'seed': SEED,
+            'repeat': repeat,
+            'sizes': list(sizes),
+            'cases': [case.name for case in cases],
+            'memory': memory
+        },
+        'results': results
+    }
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Per-case ratios against a baseline document
+
+    Returns a list of dicts with case, rows, seconds_ratio, memory_ratio
+    and regression (True when time or memory grew beyond tolerance).
+    """
+    reference = {(item['case'], item['rows']): item for item in baseline['results']}
+    comparison = []
+    for item in results['results']:
+        base = reference.get((item['case'], item['rows']))
+        if base is None:
+            continue
+        slower = (item['seconds'] > base['seconds'] * (1 + tolerance)
+                  and item['seconds'] - base['seconds'] > MIN_SECONDS_DELTA)
+        larger = (item['peak_mb'] is not None and base.get('peak_mb') is not None
+                  and item['peak_mb'] > base['peak_mb'] * (1 + tolerance)
+                  and item['peak_mb'] - base['peak_mb'] > MIN_MB_DELTA)
+        comparison.append({
+            'case': item['case'],
+            'rows': item['rows'],
+            'seconds_ratio': item['seconds'] / base['seconds'] if base['seconds'] else None,
+            'memory_ratio': (item['peak_mb'] / base['peak_mb']
+                             if item['peak_mb'] is not None and base.get('peak_mb') else None),
+            'regression': slower or larger
+        })
+    return comparison
+
+def confirm(results, comparison, repeat=REPEAT, memory=True):
+    """Re-run the cases flagged in comparison, keeping each case's best run
+
+    One slow run on a shared machine is usually noise; a real regression
+    is slow both times. Updates results in place and returns it.
+    """
+    measured = {(item['case'], item['rows']): item for item in results['results']}
+    for item in comparison:
+        if not item['regression']:
+            continue
+        sizes = [] if item['rows'] is None else [item['rows']]
+        rerun = run_suite(sizes, [item['case']], repeat, memory, log=lambda line: None)
+        for new in rerun['results']:
+            old = measured.get((new['case'], new['rows']))
+            if old is None:
+                continue
+            old['seconds'] = min(old['seconds'], new['seconds'])
+            if old['peak_mb'] is not None and new['peak_mb'] is not None:
+                old['peak_mb'] = min(old['peak_mb'], new['peak_mb'])
+    return results
+
+def _write_json(document, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the platform's hot paths")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--cases', nargs='+', choices=[case.name for case in CASES])
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced-memory run")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', help="Baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--save-baseline', action='store_true', help=f"Also write {BASELINE_PATH}")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.cases, args.repeat, not args.no_memory)
+    _write_json(results, args.output)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        _write_json(results, BASELINE_PATH)
+        print(f"Baseline written to {BASELINE_PATH}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline, args.tolerance)
+        flagged = sum(item['regression'] for item in comparison)
+        if flagged:
+            print(f"Re-running {flagged} case(s) beyond tolerance")
+            confirm(results, comparison, args.repeat, not args.no_memory)
+            _write_json(results, args.output)
+            comparison = compare(results, baseline, args.tolerance)
+        for item in comparison:
+            seconds = f"{item['seconds_ratio']:.2f}x" if item['seconds_ratio'] else '-'
+            memory = f"{item['memory_ratio']:.2f}x" if item['memory_ratio'] else '-'
+            flag = '  REGRESSION' if item['regression'] else ''
+            print(f"{item['case']:30s} {item['rows'] if item['rows'] is not None else '-':>9}  "
+                  f"time {seconds:>7}  memory {memory:>7}{flag}")
+        if any(item['regression'] for item in comparison):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
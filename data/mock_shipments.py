@@ -1,31 +1,143 @@
-import pandas as pd
+import argparse
+import time
 import numpy as np
-from datetime import datetime, timedelta
-
-def generate_mock_data(n_samples=100):
-    cities = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 
-              'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose']
-    
-    statuses = ['In Transit', 'Delivered', 'Delayed', 'Processing']
-    weather_conditions = ['Clear', 'Rain', 'Snow', 'Storm']
-    
-    data = {
-        'shipment_id': [f'SHP{str(i).zfill(6)}' for i in range(n_samples)],
-        'origin': np.random.choice(cities, n_samples),
-        'destination': np.random.choice(cities, n_samples),
-        'status': np.random.choice(statuses, n_samples, p=[0.4, 0.3, 0.2, 0.1]),
-        'departure_time': [
-            datetime.now() - timedelta(days=np.random.randint(0, 10))
-            for _ in range(n_samples)
-        ],
-        'estimated_arrival': [
-            datetime.now() + timedelta(days=np.random.randint(1, 5))
-            for _ in range(n_samples)
+import pandas as pd
+from utils.geo_utils import CITY_COORDS, haversine_km
+from utils.lazy_imports import lazy_import
+
+pa = lazy_import('pyarrow')
+pc = lazy_import('pyarrow.compute')
+pq = lazy_import('pyarrow.parquet')
+
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix',
+          'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose']
+STATUSES = ['In Transit', 'Delivered', 'Delayed', 'Processing']
+WEATHER_CONDITIONS = ['Clear', 'Rain', 'Snow', 'Storm']
+
+MOCK_CHUNK_ROWS = 1_000_000
+DEPARTURE_WINDOW_HOURS = 72  # Departures spread over the last three days
+ROAD_FACTOR = 1.25  # Road distance over great-circle distance
+AVERAGE_SPEED_KMH = 65
+HANDLING_HOURS = 6
+PROCESSING_HOURS = 4  # Shipments younger than this are still Processing
+DELAYED_HOURS = 5  # Undelivered shipments running later than this are Delayed
+# Extra delay in hours per weather condition, in WEATHER_CONDITIONS order
+WEATHER_DELAY_HOURS = np.array([0.0, 1.0, 2.5, 4.0])
+
+def _weather_probabilities(latitudes):
+    """Per-city weather distribution: colder, northern cities see more snow"""
+    north = np.clip((np.asarray(latitudes) - 30) / 12, 0, 1)
+    probabilities = np.column_stack([
+        0.60 - 0.20 * north,  # Clear
+        0.25 * np.ones_like(north),  # Rain
+        0.02 + 0.18 * north,  # Snow
+        0.13 * np.ones_like(north) - 0.02 * north  # Storm
+    ])
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+def _shipment_ids(start, n):
+    """SHPnnnnnn IDs for start..start+n-1, built column-wise in Arrow"""
+    numbers = pa.array(np.arange(start, start + n, dtype=np.int64)).cast(pa.string())
+    ids = pc.binary_join_element_wise('SHP', pc.utf8_lpad(numbers, width=6, padding='0'), '')
+    return pd.Series(pd.arrays.ArrowStringArray(ids))
+
+def generate_mock_data(n_samples=100, seed=None, start_id=0, now=None):
+    """Generate synthetic shipments
+
+    Every column is drawn in one vectorized pass. Distances follow the
+    city coordinates, weather depends on the origin's latitude, and delay
+    grows with weather severity and distance, so models trained on the
+    data have real signal to learn.
+
+    Parameters:
+    - n_samples: Number of shipments
+    - seed: Seed or np.random.Generator; None draws fresh data each call
+    - start_id: Number of the first SHPnnnnnn ID
+    - now: Reference time for departures and status, defaults to the current time
+
+    Returns:
+    - DataFrame with categorical city, status and weather columns
+    """
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+
+    lat = np.array([CITY_COORDS[city][0] for city in CITIES])
+    lon = np.array([CITY_COORDS[city][1] for city in CITIES])
+    k = len(CITIES)
+    origin = rng.integers(0, k, n_samples)
+    # Destination differs from origin
+    destination = (origin + rng.integers(1, k, n_samples)) % k
+
+    distances = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) * ROAD_FACTOR
+    distance_km = distances[origin, destination] * rng.lognormal(0.0, 0.08, n_samples)
+
+    cumulative = np.cumsum(_weather_probabilities(lat), axis=1)
+    weather = (rng.random(n_samples)[:, None] > cumulative[origin]).sum(axis=1)
+    weather = np.minimum(weather, len(WEATHER_CONDITIONS) - 1)
+
+    delay_hours = (
+        rng.gamma(1.5, 0.6, n_samples)
+        + WEATHER_DELAY_HOURS[weather] * rng.uniform(0.6, 1.4, n_samples)
+        + distance_km / 1500
+    )
+
+    hour_ns = 3_600_000_000_000
+    age_hours = rng.uniform(0, DEPARTURE_WINDOW_HOURS, n_samples)
+    transit_hours = distance_km / AVERAGE_SPEED_KMH + HANDLING_HOURS
+    departure = now.value - (age_hours * hour_ns).astype(np.int64)
+    arrival = departure + (transit_hours * hour_ns).astype(np.int64)
+
+    status = np.select(
+        [
+            age_hours < PROCESSING_HOURS,
+            age_hours > transit_hours + delay_hours,
+            delay_hours > DELAYED_HOURS
         ],
-        'weather_condition': np.random.choice(weather_conditions, n_samples),
-        'distance_km': np.random.uniform(100, 3000, n_samples),
-        'predicted_delay': np.random.uniform(0, 5, n_samples)
-    }
-    
-    df = pd.DataFrame(data)
-    return df
+        [STATUSES.index('Processing'), STATUSES.index('Delivered'), STATUSES.index('Delayed')],
+        default=STATUSES.index('In Transit')
+    )
+
+    return pd.DataFrame({
+        'shipment_id': _shipment_ids(start_id, n_samples),
+        'origin': pd.Categorical.from_codes(origin, CITIES),
+        'destination': pd.Categorical.from_codes(destination, CITIES),
+        'status': pd.Categorical.from_codes(status, STATUSES),
+        'departure_time': pd.to_datetime(departure, unit='ns'),
+        'estimated_arrival': pd.to_datetime(arrival, unit='ns'),
+        'weather_condition': pd.Categorical.from_codes(weather, WEATHER_CONDITIONS),
+        'distance_km': distance_km.astype(np.float32),
+        'predicted_delay': delay_hours.astype(np.float32)
+    })
+
+def iter_mock_chunks(n_samples, chunk_rows=MOCK_CHUNK_ROWS, seed=None, now=None):
+    """Yield generate_mock_data frames of up to chunk_rows rows with consecutive IDs"""
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    for start in range(0, n_samples, chunk_rows):
+        yield generate_mock_data(min(chunk_rows, n_samples - start), seed=rng, start_id=start, now=now)
+
+def write_mock_parquet(path, n_samples, chunk_rows=MOCK_CHUNK_ROWS, seed=None):
+    """Write n_samples synthetic shipments to a Parquet file chunk by chunk; returns the path"""
+    writer = None
+    try:
+        for chunk in iter_mock_chunks(n_samples, chunk_rows, seed):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic shipment dataset to Parquet")
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-rows', type=int, default=MOCK_CHUNK_ROWS)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_mock_parquet(args.path, args.rows, args.chunk_rows, args.seed)
+    print(f"Wrote {args.rows:,} shipments to {args.path} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,117 @@
+import os
+import time
+import threading
+from datetime import datetime
+import pandas as pd
+from utils.instrumentation import incr, instrument
+
+# Seconds between scheduled refreshes; 0 refreshes only on request
+REFRESH_INTERVAL_SECONDS = float(os.environ.get('SMARTLOGISTICS_REFRESH_SECONDS', 300))
+
+@instrument()
+def build_snapshot():
+    """Pull, score and enrich a fresh shipment table
+
+    Runs off the UI thread. Weather for every city in the table is fetched
+    into the shared cache so pages render without waiting on the API.
+    """
+    from data.mock_shipments import generate_mock_data
+    from utils.ml_utils import score_shipments
+    from utils.weather_utils import get_weather_for_cities
+
+    data = score_shipments(generate_mock_data())
+    get_weather_for_cities(pd.unique(pd.concat([data['origin'], data['destination']]).astype(str)))
+    return data
+
+class RefreshWorker:
+    """
+    Background thread that rebuilds the shared shipment store on a fixed
+    interval or on request. Each refresh publishes a new immutable
+    snapshot through set_shipment_store, so sessions never wait on a
+    refresh and never see a half-built table. A failed refresh keeps the
+    current snapshot.
+    """
+
+    def __init__(self, refresh=build_snapshot, interval=REFRESH_INTERVAL_SECONDS):
+        self.refresh = refresh
+        self.interval = interval
+        self.running = False
+        self.runs = 0
+        self.last_success = None
+        self.last_error = None
+        self.last_duration = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._loop, name='shipment-refresh', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def request_refresh(self):
+        """Ask for a refresh as soon as the worker is free; returns immediately"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            self.refresh_once()
+
+    def refresh_once(self):
+        """Run one refresh in the calling thread; returns the published store or None"""
+        from data.shipment_store import set_shipment_store
+
+        self.running = True
+        start = time.perf_counter()
+        try:
+            refreshed_at = datetime.now()
+            store = set_shipment_store(self.refresh(), refreshed_at=refreshed_at)
+        except Exception as e:
+            incr('refresh.failures')
+            self.last_error = f"{type(e).__name__}: {e}"
+            return None
+        else:
+            incr('refresh.snapshots')
+            self.last_success = refreshed_at
+            self.last_error = None
+            return store
+        finally:
+            self.runs += 1
+            self.last_duration = time.perf_counter() - start
+            self.running = False
+
+    def status(self):
+        return {
+            'running': self.running,
+            'runs': self.runs,
+            'interval': self.interval,
+            'last_success': self.last_success,
+            'last_error': self.last_error,
+            'last_duration': self.last_duration
+        }
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_refresh_worker():
+    """Process-wide refresh worker, started on first use"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = RefreshWorker().start()
+    return _worker
@@ -0,0 +1,402 @@
+import bisect
+import threading
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+BITMAP_COLUMNS = ['origin', 'destination', 'status']
+ID_PREFIX = 'SHP'
+
+def _numeric_ids(ids):
+    """int64 numbers of fixed-width SHPnnnnnn IDs, or None if any ID has another shape
+
+    With a fixed width the number identifies the ID exactly, and an integer
+    hash index builds several times faster than one over strings.
+    """
+    ids = pd.Series(ids, dtype='string[pyarrow]')
+    if not len(ids) or ids.isna().any():
+        return None
+    lengths = ids.str.len()
+    if lengths.min() != lengths.max() or not ids.str.fullmatch(ID_PREFIX + r'\d{1,18}').all():
+        return None
+    return ids.str.slice(len(ID_PREFIX)).astype('int64').to_numpy(), int(lengths.iloc[0])
+
+class ShipmentIndex:
+    """
+    Read-only lookup structures over one shipment frame: a hash index on
+    shipment_id, packed bitmaps per value of origin, destination and
+    status, and cached distinct values. Filters are bitmap intersections
+    and ID lookups are hash probes, so neither scans the frame.
+
+    Built per immutable frame; bitmaps are built on first use per column.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.n = len(frame)
+        numeric = _numeric_ids(frame['shipment_id'])
+        if numeric is not None:
+            numbers, self._id_width = numeric
+            self._ids = pd.Index(numbers)
+        else:
+            self._id_width = None
+            self._ids = pd.Index(frame['shipment_id'].to_numpy(dtype=object))
+        self._bitmaps = {}
+        self._distinct = {}
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def take(self, positions):
+        """Rows at the given positions, in that order"""
+        return self.frame.take(positions)
+
+    def _codes(self, column):
+        """Integer codes and their labels for a column"""
+        values = self.frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values.cat.codes.to_numpy(), list(values.cat.categories)
+        codes, labels = pd.factorize(values)
+        return codes, list(labels)
+
+    def _column_bitmaps(self, column):
+        bitmaps = self._bitmaps.get(column)
+        if bitmaps is None:
+            with self._lock:
+                bitmaps = self._bitmaps.get(column)
+                if bitmaps is None:
+                    codes, labels = self._codes(column)
+                    order = np.argsort(codes, kind='stable')
+                    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+                    bitmaps = {}
+                    for code, label in enumerate(labels):
+                        rows = order[bounds[code]:bounds[code + 1]]
+                        if len(rows):
+                            mask = np.zeros(self.n, dtype=bool)
+                            mask[rows] = True
+                            bitmaps[label] = np.packbits(mask)
+                    self._bitmaps[column] = bitmaps
+        return bitmaps
+
+    def bitmap(self, column, value):
+        """Packed bitmap of the rows where column == value"""
+        bitmap = self._column_bitmaps(column).get(value)
+        return bitmap if bitmap is not None else np.zeros((self.n + 7) // 8, dtype=np.uint8)
+
+    def _filter_bitmap(self, filters):
+        """Intersection of the bitmaps for the given column=value filters, or None for no filter"""
+        bitmaps = [self.bitmap(column, value) for column, value in filters.items() if value is not None]
+        return reduce(np.bitwise_and, bitmaps) if bitmaps else None
+
+    def select(self, **filters):
+        """Ascending row positions matching every column=value filter; None values are ignored"""
+        bitmap = self._filter_bitmap(filters)
+        if bitmap is None:
+            return np.arange(self.n)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n))
+
+    def count(self, **filters):
+        """Number of rows matching the filters, from bitmap popcounts"""
+        bitmap = self._filter_bitmap(filters)
+        return self.n if bitmap is None else int(np.bitwise_count(bitmap).sum())
+
+    def lookup(self, shipment_id, **filters):
+        """Row position of a shipment, or None if it is missing or fails a filter"""
+        key = shipment_id
+        if self._id_width is not None:
+            digits = str(shipment_id)[len(ID_PREFIX):]
+            if len(str(shipment_id)) != self._id_width or not str(shipment_id).startswith(ID_PREFIX) \
+                    or not digits.isdigit():
+                return None
+            key = int(digits)
+        positions = self._ids.get_indexer_for([key])
+        if not len(positions) or positions[0] < 0:
+            return None
+        position = positions[0]
+        for column, value in filters.items():
+            if value is not None and not self.bitmap(column, value)[position >> 3] & (0x80 >> (position & 7)):
+                return None
+        return int(position)
+
+    def contains(self, shipment_ids):
+        """Boolean array: whether each shipment ID is in the frame, via hash probes"""
+        ids = pd.Series(np.asarray(shipment_ids, dtype=object), dtype='string[pyarrow]')
+        keys = ids.to_numpy(dtype=object)
+        found = np.zeros(len(ids), dtype=bool)
+        if self._id_width is not None:
+            conforming = (ids.str.len() == self._id_width) & ids.str.fullmatch(ID_PREFIX + r'\d+')
+            conforming = conforming.fillna(False).to_numpy(dtype=bool)
+            keys = ids[conforming].str.slice(len(ID_PREFIX)).astype('int64').to_numpy()
+        else:
+            conforming = ids.notna().to_numpy()
+            keys = keys[conforming]
+        if self._ids.is_unique:
+            found[conforming] = self._ids.get_indexer(keys) >= 0
+        else:
+            found[conforming] = pd.Index(keys).isin(self._ids)
+        return found
+
+    def memory_usage(self):
+        """Bytes held by the ID index, bitmaps and sort orders built so far, not the frame"""
+        size = self._ids.memory_usage(deep=True)
+        size += sum(bitmap.nbytes for bitmaps in list(self._bitmaps.values()) for bitmap in bitmaps.values())
+        size += sum(order.nbytes for order, _ in list(self._orders.values()))
+        return int(size)
+
+    def _sort_key(self, column):
+        """Array whose order matches the column's value order, missing values last"""
+        if column == 'shipment_id' and self._id_width is not None:
+            return self._ids.to_numpy()
+        values = self.frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            labels = np.asarray(values.cat.categories, dtype=object).astype(str)
+            rank = np.empty(len(labels) + 1, dtype=np.int64)
+            rank[np.argsort(labels, kind='stable')] = np.arange(len(labels))
+            rank[-1] = len(labels)  # code -1 (missing) indexes the last slot
+            return rank[codes]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            return values.to_numpy()
+        return values.astype(str).to_numpy(dtype=object)
+
+    def sort_order(self, column, ascending=True):
+        """Positions of every row ordered by column, missing values last either way
+
+        The ascending order is computed once per column; descending reverses
+        only the block of present values.
+        """
+        entry = self._orders.get(column)
+        if entry is None:
+            order = np.argsort(self._sort_key(column), kind='stable')
+            missing = self.frame[column].isna().to_numpy()[order]
+            entry = (np.concatenate([order[~missing], order[missing]]), int(missing.sum()))
+            self._orders[column] = entry
+        order, n_missing = entry
+        if ascending:
+            return order
+        present = len(order) - n_missing
+        return np.concatenate([order[:present][::-1], order[present:]])
+
+    def page(self, filters=None, sort_by=None, ascending=True, offset=0, limit=50):
+        """One page of matching row positions, optionally sorted
+
+        Sorting walks a cached whole-table order and keeps the rows set in the
+        filter bitmap, so no frame is built beyond the returned page.
+
+        Returns:
+        - positions: Row positions of the page, in display order
+        - total: Number of rows matching the filters
+        """
+        filters = filters or {}
+        bitmap = self._filter_bitmap(filters)
+        if sort_by is None:
+            if bitmap is None:
+                return np.arange(offset, min(offset + limit, self.n)), self.n
+            rows = np.flatnonzero(np.unpackbits(bitmap, count=self.n))
+        else:
+            rows = self.sort_order(sort_by, ascending)
+            if bitmap is not None:
+                rows = rows[np.unpackbits(bitmap, count=self.n).view(bool)[rows]]
+        return rows[offset:offset + limit], len(rows)
+
+    def distinct(self, column):
+        """Sorted distinct values present in a column, cached"""
+        values = self._distinct.get(column)
+        if values is None:
+            codes, labels = self._codes(column)
+            present = np.bincount(codes[codes >= 0], minlength=len(labels)) > 0
+            values = sorted(label for label, seen in zip(labels, present) if seen)
+            self._distinct[column] = values
+        return values
+
+class OverlayIndex:
+    """
+    Index over a session's view of a shared table: a small overlay frame of
+    the session's added and edited rows on top of the shared table's
+    ShipmentIndex, with the shared rows the overlay replaces hidden.
+
+    Only the overlay is indexed per session; bitmaps and sort orders of the
+    shared table are reused. Positions below len(overlay) are overlay rows
+    and len(overlay) + p is shared row p, so positions are only meaningful
+    to this index's take().
+    """
+
+    def __init__(self, base, overlay, hidden=()):
+        self.base = base
+        self.overlay = ShipmentIndex(overlay)
+        self.offset = len(overlay)
+        self.hidden = np.asarray(hidden, dtype=np.int64)  # Sorted base positions
+        self.n = self.offset + base.n - len(self.hidden)
+        self._visible = None
+        self._distinct = {}
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def columns(self):
+        return list(dict.fromkeys(self.overlay.columns + self.base.columns))
+
+    def take(self, positions):
+        """Rows at the given positions, in that order"""
+        from data.shipment_store import concat_shipments
+
+        positions = np.asarray(positions, dtype=np.int64)
+        in_overlay = positions < self.offset
+        rows = concat_shipments([
+            self.overlay.frame.take(positions[in_overlay]),
+            self.base.frame.take(positions[~in_overlay] - self.offset)
+        ])
+        order = np.concatenate([np.flatnonzero(in_overlay), np.flatnonzero(~in_overlay)])
+        return rows.take(np.argsort(order, kind='stable')).reset_index(drop=True)
+
+    def memory_usage(self):
+        """Bytes held for this view alone; the overlay frame and the shared index are not counted"""
+        visible = self._visible.nbytes if self._visible is not None else 0
+        return self.overlay.memory_usage() + self.hidden.nbytes + visible
+
+    def _visible_bitmap(self):
+        """Packed bitmap of the base rows not replaced by the overlay, or None for all"""
+        if self._visible is None and len(self.hidden):
+            mask = np.ones(self.base.n, dtype=bool)
+            mask[self.hidden] = False
+            self._visible = np.packbits(mask)
+        return self._visible
+
+    def _base_bitmap(self, filters):
+        """Packed bitmap of visible base rows matching the filters, or None for every base row"""
+        bitmap = self.base._filter_bitmap(filters)
+        visible = self._visible_bitmap()
+        if visible is None:
+            return bitmap
+        return visible if bitmap is None else bitmap & visible
+
+    def _base_rows(self, filters):
+        """Ascending visible base positions matching the filters, or None for every base row"""
+        bitmap = self._base_bitmap(filters)
+        return None if bitmap is None else np.flatnonzero(np.unpackbits(bitmap, count=self.base.n))
+
+    def select(self, **filters):
+        """Positions matching every column=value filter, overlay rows first"""
+        base = self._base_rows(filters)
+        base = np.arange(self.base.n) if base is None else base
+        return np.concatenate([self.overlay.select(**filters), base + self.offset])
+
+    def count(self, **filters):
+        bitmap = self._base_bitmap(filters)
+        base = self.base.n if bitmap is None else int(np.bitwise_count(bitmap).sum())
+        return self.overlay.count(**filters) + base
+
+    def lookup(self, shipment_id, **filters):
+        """Position of a shipment, or None if it is missing or fails a filter"""
+        if self.overlay.lookup(shipment_id) is not None:
+            # The overlay's version wins; the base row it replaces is hidden
+            return self.overlay.lookup(shipment_id, **filters)
+        position = self.base.lookup(shipment_id, **filters)
+        return None if position is None else position + self.offset
+
+    def _overlay_keys(self, column, rows):
+        """Sort keys of overlay rows in the base's _sort_key space, and their missing mask"""
+        values = self.overlay.frame[column].take(rows)
+        missing = values.isna().to_numpy()
+        base_values = self.base.frame[column]
+        if column == 'shipment_id' and self.base._id_width is not None:
+            digits = self.base._id_width - len(ID_PREFIX)
+            keys = []
+            for value in values.astype(str):
+                if len(value) == self.base._id_width and value.startswith(ID_PREFIX) \
+                        and value[len(ID_PREFIX):].isdigit():
+                    keys.append(int(value[len(ID_PREFIX):]))
+                else:
+                    # Between the base numbers whose padded IDs sort around it
+                    keys.append(bisect.bisect_left(
+                        range(10 ** digits), value, key=lambda number: f'{ID_PREFIX}{number:0{digits}d}'
+                    ) - 0.5)
+            return np.asarray(keys), missing
+        if isinstance(base_values.dtype, pd.CategoricalDtype):
+            labels = np.sort(np.asarray(base_values.cat.categories, dtype=object).astype(str))
+            labels_with_end = np.append(labels, None)
+            values = values.astype(str).to_numpy(dtype=object)
+            ranks = np.searchsorted(labels, values)
+            # Labels the base lacks sit halfway between their neighbours' ranks
+            return np.where(labels_with_end[ranks] == values, ranks, ranks - 0.5), missing
+        if pd.api.types.is_numeric_dtype(base_values) or pd.api.types.is_datetime64_any_dtype(base_values):
+            return values.to_numpy(), missing
+        return values.astype(str).to_numpy(dtype=object), missing
+
+    def _merge_slots(self, column, ascending, overlay_rows, base_rows):
+        """Merged-order slot of each overlay row, for overlay rows already in display order
+
+        Overlay rows go before base rows with equal keys and, like the base,
+        after every present key when their own key is missing.
+        """
+        n_missing = int(self.base.frame[column].isna().to_numpy()[base_rows].sum())
+        present = base_rows[:len(base_rows) - n_missing]
+        keys = self.base._sort_key(column)[present]
+        if not ascending:
+            keys = keys[::-1]
+        values, missing = self._overlay_keys(column, overlay_rows)
+        if ascending:
+            before = np.searchsorted(keys, values[~missing], 'left')
+        else:
+            before = len(keys) - np.searchsorted(keys, values[~missing], 'right')
+        inserts = np.full(len(overlay_rows), len(keys), dtype=np.int64)
+        inserts[~missing] = before
+        return inserts + np.arange(len(overlay_rows))
+
+    def page(self, filters=None, sort_by=None, ascending=True, offset=0, limit=50):
+        """One page of matching positions, optionally sorted; see ShipmentIndex.page
+
+        Unsorted, overlay rows come first. Sorted, overlay rows are merged
+        into the base's cached order by binary search on the sort key.
+        """
+        filters = filters or {}
+        overlay_rows = self.overlay.select(**filters)
+        base_rows = self._base_rows(filters)
+        if sort_by is None:
+            slots = np.arange(len(overlay_rows))
+        else:
+            order = self.base.sort_order(sort_by, ascending)
+            if base_rows is not None:
+                keep = np.zeros(self.base.n, dtype=bool)
+                keep[base_rows] = True
+                order = order[keep[order]]
+            base_rows = order
+            matching = np.zeros(self.overlay.n, dtype=bool)
+            matching[overlay_rows] = True
+            overlay_order = self.overlay.sort_order(sort_by, ascending)
+            overlay_rows = overlay_order[matching[overlay_order]]
+            slots = self._merge_slots(sort_by, ascending, overlay_rows, base_rows)
+
+        n_base = self.base.n if base_rows is None else len(base_rows)
+        total = len(overlay_rows) + n_base
+        window = np.arange(offset, min(offset + limit, total))
+        from_overlay = np.isin(window, slots)
+        positions = np.empty(len(window), dtype=np.int64)
+        positions[from_overlay] = overlay_rows[np.searchsorted(slots, window[from_overlay])]
+        base_index = window[~from_overlay] - np.searchsorted(slots, window[~from_overlay])
+        positions[~from_overlay] = self.offset + (base_index if base_rows is None else base_rows[base_index])
+        return positions, total
+
+    def distinct(self, column):
+        """Sorted distinct values present in a column, cached"""
+        values = self._distinct.get(column)
+        if values is None:
+            present = set(self.overlay.distinct(column))
+            visible = self._visible_bitmap()
+            if visible is None:
+                present.update(self.base.distinct(column))
+            else:
+                present.update(
+                    label for label, bitmap in self.base._column_bitmaps(column).items()
+                    if np.bitwise_count(bitmap & visible).any()
+                )
+            values = sorted(present)
+            self._distinct[column] = values
+        return values
@@ -0,0 +1,617 @@
+import bisect
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.metrics_engine import KpiAggregator, ShipmentCube
+from data.shipment_index import OverlayIndex, ShipmentIndex
+
+STATUSES = ['In Transit', 'Delivered', 'Delayed', 'Processing']
+WEATHER_CONDITIONS = ['Clear', 'Rain', 'Snow', 'Storm']
+CITY_COLUMNS = ['origin', 'destination']
+CATEGORY_COLUMNS = ['origin', 'destination', 'status', 'weather_condition']
+FLOAT_COLUMNS = ['distance_km', 'predicted_delay']
+DATETIME_COLUMNS = ['departure_time', 'estimated_arrival']
+SHIPMENT_COLUMNS = [
+    'shipment_id', 'origin', 'destination', 'status', 'departure_time',
+    'estimated_arrival', 'weather_condition', 'distance_km', 'predicted_delay'
+]
+ID_DTYPE = 'string[pyarrow]'
+# Columns that place a shipment in an analytics cube cell
+CUBE_FIELDS = ['origin', 'destination', 'weather_condition', 'departure_time', 'predicted_delay']
+# Snapshot versions kept in memory at once; the latest is always kept
+CACHE_MAX_VERSIONS = int(os.environ.get('SMARTLOGISTICS_CACHE_VERSIONS', 3))
+CACHE_MAX_BYTES = int(float(os.environ.get('SMARTLOGISTICS_CACHE_MB', 2048)) * 1e6)
+
+def _base_categories(column):
+    """Categories every frame starts with, so codes stay stable across frames"""
+    if column in CITY_COLUMNS:
+        from utils.geo_utils import get_city_registry
+        return list(get_city_registry().names)
+    return STATUSES if column == 'status' else WEATHER_CONDITIONS
+
+def compact_shipments(df):
+    """Convert a shipment frame to the compact columnar schema
+
+    Categorical codes for cities, status and weather, float32 measures,
+    datetime64 timestamps and Arrow-backed IDs. Missing schema columns are
+    added as nulls; extra columns are kept unchanged.
+    """
+    compact = {}
+    n = len(df)
+    for column in SHIPMENT_COLUMNS:
+        values = df[column] if column in df else pd.Series([None] * n, index=df.index)
+        if column in CATEGORY_COLUMNS:
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                observed = values.cat.categories
+            else:
+                observed = pd.unique(values.dropna())
+            base = _base_categories(column)
+            extra = [value for value in observed if value not in set(base)]
+            compact[column] = pd.Categorical(values, categories=base + extra)
+        elif column in FLOAT_COLUMNS:
+            compact[column] = pd.to_numeric(values, errors='coerce').astype(np.float32)
+        elif column in DATETIME_COLUMNS:
+            compact[column] = pd.to_datetime(values, errors='coerce')
+        else:
+            compact[column] = values.astype(ID_DTYPE)
+
+    result = pd.DataFrame(compact, index=df.index)
+    for column in df.columns:
+        if column not in compact:
+            result[column] = df[column]
+    return result.reset_index(drop=True)
+
+def concat_shipments(frames):
+    """Concatenate compact frames, unifying categories so columns stay categorical"""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return compact_shipments(pd.DataFrame(columns=SHIPMENT_COLUMNS))
+    if len(frames) == 1:
+        return frames[0]
+
+    aligned = [frame.copy(deep=False) for frame in frames]
+    for column in CATEGORY_COLUMNS:
+        if column not in frames[0]:
+            continue
+        categories = list(dict.fromkeys(
+            value for frame in frames for value in frame[column].cat.categories
+        ))
+        for frame in aligned:
+            if list(frame[column].cat.categories) != categories:
+                frame[column] = frame[column].cat.set_categories(categories)
+    return pd.concat(aligned, ignore_index=True)
+
+def _frame_bytes(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+def _set_values(frame, rows, values):
+    """Assign column values at row labels in place, extending categories as needed"""
+    for column, value in values.items():
+        if column in CATEGORY_COLUMNS and value is not None and value not in frame[column].cat.categories:
+            frame[column] = frame[column].cat.add_categories([value])
+        frame.loc[rows, column] = value
+
+def _max_id_number(ids):
+    """Largest numeric part of SHPnnnnnn IDs, or -1"""
+    numbers = pd.Series(ids, dtype=ID_DTYPE).str.extract(r'^SHP(\d+)$')[0]
+    numbers = pd.to_numeric(numbers, errors='coerce')
+    return int(numbers.max()) if numbers.notna().any() else -1
+
+class ShipmentIdAllocator:
+    """Thread-safe monotonic SHPnnnnnn ID source; never reuses a number"""
+
+    def __init__(self, start=0):
+        self._next = start
+        self._lock = threading.Lock()
+
+    def allocate(self, n=1):
+        with self._lock:
+            start = self._next
+            self._next += n
+        return [f'SHP{i:06d}' for i in range(start, start + n)]
+
+    def advance_past(self, number):
+        with self._lock:
+            self._next = max(self._next, number + 1)
+
+class ShipmentLog:
+    """
+    Append-only shipment log. Inserted batches are buffered and sealed into
+    compact chunks of about CHUNK_ROWS rows or CHUNK_BATCHES batches, so an
+    insert never copies the rows already logged. Batches are kept newest
+    first. A dict of logged IDs answers membership and row lookups without
+    building the full frame.
+    """
+    CHUNK_ROWS = 4096
+    CHUNK_BATCHES = 64
+
+    def __init__(self):
+        self._chunks = []  # Sealed, oldest chunk first; each chunk newest batch first
+        self._pending = []  # Unsealed batches, oldest first
+        self._pending_rows = 0
+        self._rows = 0
+        self._ids = {}  # shipment_id -> row number in insertion order
+        self._starts = []  # Row number of each batch's first row, oldest batch first
+        self.version = 0
+        self._frame = None
+        self._frame_version = -1
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._rows
+
+    def _seal(self):
+        if self._pending:
+            self._chunks.append(concat_shipments(self._pending[::-1]))
+            self._pending = []
+            self._pending_rows = 0
+
+    def append(self, rows):
+        """Add a compact batch of shipments"""
+        with self._lock:
+            if len(rows) >= self.CHUNK_ROWS:
+                self._seal()
+                self._chunks.append(rows)
+            else:
+                self._pending.append(rows)
+                self._pending_rows += len(rows)
+                if self._pending_rows >= self.CHUNK_ROWS or len(self._pending) >= self.CHUNK_BATCHES:
+                    self._seal()
+            self._starts.append(self._rows)
+            self._ids.update(zip(rows['shipment_id'].tolist(), range(self._rows, self._rows + len(rows))))
+            self._rows += len(rows)
+            self.version += 1
+
+    def contains(self, shipment_ids):
+        """Boolean array: whether each shipment ID has been logged"""
+        ids = self._ids
+        return np.fromiter((shipment_id in ids for shipment_id in shipment_ids), dtype=bool, count=len(shipment_ids))
+
+    def row(self, shipment_id):
+        """One-row frame of a logged shipment, or None, found without building the full frame"""
+        with self._lock:
+            number = self._ids.get(shipment_id)
+            if number is None:
+                return None
+            # Position in frame(): batches newest first, rows of a batch in insertion order
+            batch = bisect.bisect_right(self._starts, number) - 1
+            end = self._starts[batch + 1] if batch + 1 < len(self._starts) else self._rows
+            position = self._rows - end + number - self._starts[batch]
+            for part in self._pending[::-1] + self._chunks[::-1]:
+                if position < len(part):
+                    return part.iloc[[position]]
+                position -= len(part)
+
+    def newest(self, n):
+        """The n most recently added rows, newest batch first, touching only the tail"""
+        with self._lock:
+            parts, remaining = [], n
+            for part in self._pending[::-1] + self._chunks[::-1]:
+                if remaining <= 0:
+                    break
+                parts.append(part.iloc[:remaining])
+                remaining -= len(parts[-1])
+        return concat_shipments(parts)
+
+    def memory_usage(self):
+        """Bytes held by the logged rows and the cached full frame"""
+        with self._lock:
+            parts = self._chunks + self._pending
+            frame = self._frame
+        size = sum(_frame_bytes(part) for part in parts) + sys.getsizeof(self._ids)
+        if frame is not None and not any(frame is part for part in parts):
+            size += _frame_bytes(frame)
+        return size
+
+    def frame(self):
+        """All logged rows, newest batch first; rebuilt only after new inserts"""
+        with self._lock:
+            if self._frame_version != self.version:
+                self._frame = concat_shipments(self._pending[::-1] + self._chunks[::-1])
+                self._frame_version = self.version
+            return self._frame
+
+class ShipmentStore:
+    """Immutable, compact shipment table shared by every session in the process
+
+    A store is a snapshot: it is never modified after publication, so
+    readers holding it always see one consistent version. refreshed_at is
+    when its data was produced.
+    """
+
+    def __init__(self, data, version=1, id_allocator=None, refreshed_at=None):
+        self.data = compact_shipments(data)
+        self.version = version
+        self.refreshed_at = refreshed_at or datetime.now()
+        self.evicted = False  # Set once the cache drops this version
+        self.id_allocator = id_allocator or ShipmentIdAllocator()
+        self.id_allocator.advance_past(_max_id_number(self.data['shipment_id']))
+        self.kpis = KpiAggregator.from_frame(self.data)
+        self.cube = ShipmentCube.from_frame(self.data)
+        self._table_bytes = _frame_bytes(self.data) + self.cube.memory_usage()
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._sessions = weakref.WeakSet()  # Live session views reading this store
+        self._sessions_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def index(self):
+        """Lookup index over the shared table, built on first use"""
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = ShipmentIndex(self.data)
+        return self._index
+
+    def warm(self):
+        """Build the lazily created lookup structures before publication"""
+        index = self.index
+        for column in ('origin', 'destination', 'status'):
+            index.distinct(column)
+        return self
+
+    def add_session(self, session):
+        """Count a session view's memory against this store until it is dropped"""
+        with self._sessions_lock:
+            self._sessions.add(session)
+
+    def memory_usage(self):
+        """Bytes held by the shared table, its cube and index, and the session views on it"""
+        index = self._index.memory_usage() if self._index is not None else 0
+        with self._sessions_lock:
+            sessions = list(self._sessions)
+        return self._table_bytes + index + sum(session.memory_usage() for session in sessions)
+
+class SessionShipments:
+    """
+    Per-session view over the shared store. Only edits live here: an
+    append-only log of rows the session added and per-shipment field
+    patches. Readers see the shared table plus a small overlay frame of the
+    added and edited rows, unioned lazily, so the shared rows are never
+    copied per session; only frame(), for exports, materializes the union.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.added = ShipmentLog()
+        self.updates = {}
+        self.kpi_delta = KpiAggregator()  # This session's edits relative to the store
+        self.cube_delta = ShipmentCube()
+        self._cube_edits = []  # (old row, new row) pairs not yet folded into cube_delta
+        self._cube = None
+        self._edited = {}  # shipment_id -> store position of each patched store row
+        self._edits = 0
+        self._overlay = None
+        self._overlay_key = None
+        self._hidden = None
+        self._index = None
+        self._size = None
+        self._size_key = None
+        store.add_session(self)
+
+    @property
+    def has_edits(self):
+        return bool(len(self.added) or self.updates)
+
+    def append(self, rows):
+        """Add new shipments, shown first; returns their IDs
+
+        Rows without an ID, or whose ID is already taken by the store, this
+        session or an earlier row of the batch, get a fresh one. Given IDs
+        move the allocator past them, so it never hands them out again.
+        """
+        rows = compact_shipments(rows)
+        ids = rows['shipment_id']
+        given = ids.notna().to_numpy()
+        if given.any():
+            self.store.id_allocator.advance_past(_max_id_number(ids[given]))
+        taken = ~given | ids.duplicated().to_numpy() | self.store.index.contains(ids)
+        if len(self.added):
+            taken |= self.added.contains(ids.tolist())
+        if taken.any():
+            rows.loc[taken, 'shipment_id'] = self.store.id_allocator.allocate(int(taken.sum()))
+        self.added.append(rows)
+        self.kpi_delta.add(rows)
+        self.cube_delta.add(rows)
+        self._cube = None
+        return rows['shipment_id'].tolist()
+
+    def _current(self, shipment_id):
+        """A shipment's current values as a one-row frame and its store position
+
+        Returns (None, None) for an unknown shipment and a None position for
+        rows this session added. Found through the ID indexes of the added
+        rows and of the store, so no table is scanned or copied.
+        """
+        row, store_position = self.added.row(shipment_id), None
+        if row is None:
+            store_position = self.store.index.lookup(shipment_id)
+            if store_position is None:
+                return None, None
+            row = self.store.data.iloc[[store_position]]
+        row = row.reset_index(drop=True)
+        if shipment_id in self.updates:
+            _set_values(row, [0], self.updates[shipment_id])
+        return row, store_position
+
+    def update(self, shipment_id, **values):
+        """Record field changes for one shipment and fold them into the KPI and cube deltas"""
+        old, store_position = self._current(shipment_id)
+        if old is not None:
+            current = old.iloc[0]
+            if 'status' in values:
+                self.kpi_delta.update_status(current['status'], values['status'])
+            if 'predicted_delay' in values:
+                self.kpi_delta.update_delay(float(current['predicted_delay']), float(values['predicted_delay']))
+            if any(column in values for column in CUBE_FIELDS):
+                new = old.copy()
+                _set_values(new, [0], values)
+                self._cube_edits.append((old, new))
+                self._cube = None
+            if store_position is not None:
+                self._edited[shipment_id] = store_position
+        self.updates.setdefault(shipment_id, {}).update(values)
+        self._edits += 1
+
+    def rebase(self, store):
+        """A view of store carrying this session's edits"""
+        view = SessionShipments(store)
+        if len(self.added):
+            view.append(self.added.frame())
+        for shipment_id, values in self.updates.items():
+            view.update(shipment_id, **values)
+        return view
+
+    def kpis(self):
+        """Dashboard KPIs for this session without scanning the table"""
+        return self.store.kpis.merge(self.kpi_delta).snapshot()
+
+    def cube(self):
+        """Analytics cube for this session: the store's cube plus this session's edits"""
+        if self._cube_edits:
+            # Folded in one pass: aggregating each edit on its own costs more than the edit
+            olds, news = zip(*self._cube_edits)
+            self.cube_delta.add(concat_shipments(olds), sign=-1)
+            self.cube_delta.add(concat_shipments(news))
+            self._cube_edits = []
+        if self._cube is None:
+            self._cube = self.store.cube.merge(self.cube_delta)
+        return self._cube
+
+    def memory_usage(self):
+        """Bytes held by this session's edits: added rows, overlay, cube and indexes
+
+        The shared rows are counted by the store. Recomputed only after the
+        edits or one of the structures built from them change.
+        """
+        key = (self.added.version, self._edits, self._overlay_key, self._cube, self._index)
+        if self._size_key != key:
+            size = self.added.memory_usage() + self.cube_delta.memory_usage()
+            size += sum(_frame_bytes(old) + _frame_bytes(new) for old, new in list(self._cube_edits))
+            if self._overlay is not None and self.updates:  # Otherwise it shares the added rows
+                size += _frame_bytes(self._overlay) + self._hidden.nbytes
+            if self._cube is not None and self._cube is not self.store.cube:
+                size += self._cube.memory_usage()
+            if self._index is not None:
+                size += self._index.memory_usage()
+            self._size, self._size_key = size, key
+        return self._size
+
+    def _patched(self, frame):
+        """Copy of a small frame with this session's patches applied"""
+        frame = frame.reset_index(drop=True)
+        if self.updates:
+            ids = pd.Index(frame['shipment_id'])
+            for shipment_id, values in self.updates.items():
+                rows = ids.get_indexer_for([shipment_id])
+                rows = rows[rows >= 0]
+                if len(rows):
+                    _set_values(frame, rows, values)
+        return frame
+
+    def hidden_positions(self):
+        """Sorted store positions of the rows the overlay replaces"""
+        self.overlay()
+        return self._hidden
+
+    def overlay(self):
+        """This session's rows, edits applied: added rows newest first, then edited store rows
+
+        Rebuilt only after new inserts or edits, and proportional to them.
+        """
+        key = (self.added.version, self._edits)
+        if self._overlay_key != key:
+            hidden = np.array(sorted(self._edited.values()), dtype=np.int64)
+            edited = self.store.data.take(hidden)
+            self._overlay = self._patched(concat_shipments([self.added.frame(), edited]))
+            self._hidden = hidden
+            self._overlay_key = key
+        return self._overlay
+
+    @property
+    def columns(self):
+        if not self.has_edits:
+            return list(self.store.data.columns)
+        return list(dict.fromkeys(list(self.overlay().columns) + list(self.store.data.columns)))
+
+    def index(self):
+        """Lookup index over this session's rows; the store's shared index while there are no edits"""
+        if not self.has_edits:
+            return self.store.index
+        overlay = self.overlay()
+        if self._index is None or self._index.overlay.frame is not overlay:
+            self._index = OverlayIndex(self.store.index, overlay, self._hidden)
+        return self._index
+
+    def where(self, predicate):
+        """Rows, edits applied, where predicate(frame) is true; overlay rows first
+
+        The predicate runs on the overlay and on the shared table separately,
+        so only matching rows are copied.
+        """
+        mask = np.array(predicate(self.store.data), dtype=bool)
+        if not self.has_edits:
+            return self.store.data[mask]
+        overlay = self.overlay()
+        if len(self._hidden):
+            mask[self._hidden] = False
+        return concat_shipments([
+            overlay[np.asarray(predicate(overlay), dtype=bool)],
+            self.store.data[mask]
+        ])
+
+    def newest(self, n):
+        """The n newest shipments without materializing the full table"""
+        recent = self.added.newest(n)
+        if len(recent) < n:
+            recent = concat_shipments([recent, self.store.data.iloc[:n - len(recent)]])
+        return self._patched(recent)
+
+    def frame(self, columns=None):
+        """Shared table with this session's edits applied, added rows first
+
+        Materializes every row, so it is meant for exports; pages read
+        through index(), where(), kpis() and cube() instead. columns limits
+        the copy to the given columns.
+        """
+        data = self.store.data if columns is None else self.store.data[columns]
+        if not self.has_edits:
+            return data
+        overlay = self.overlay() if columns is None else self.overlay()[columns]
+        n_added = len(self.added)
+        order = np.arange(len(overlay), len(overlay) + len(data))
+        order[self._hidden] = np.arange(n_added, len(overlay))
+        return concat_shipments([overlay, data]).take(
+            np.concatenate([np.arange(n_added), order])
+        ).reset_index(drop=True)
+
+class ShipmentStoreCache:
+    """
+    Process-level cache of shipment snapshots keyed by version. Every
+    session shares the cached stores; sessions with edits keep reading the
+    version they started from until it is evicted. Old versions are
+    evicted least recently used first once there are more than
+    max_versions or they hold more than max_bytes, counting each version's
+    table, cube and index and the session overlays on it. Sessions grow
+    between refreshes, so the limits are checked again whenever a session
+    touches its version.
+    """
+
+    def __init__(self, max_versions=CACHE_MAX_VERSIONS, max_bytes=CACHE_MAX_BYTES):
+        self.max_versions = max_versions
+        self.max_bytes = max_bytes
+        self._stores = OrderedDict()  # version -> store, least recently used first
+        self._latest = None
+        self._lock = threading.Lock()
+
+    @property
+    def latest(self):
+        return self._latest
+
+    def get(self, version):
+        """Cached store of a version, or None once evicted"""
+        with self._lock:
+            store = self._stores.get(version)
+            if store is not None:
+                self._stores.move_to_end(version)
+            return store
+
+    def touch(self, store):
+        """Mark a store as used by a session"""
+        with self._lock:
+            if store.version in self._stores:
+                self._stores.move_to_end(store.version)
+            self._evict()
+
+    def publish(self, store):
+        """Add a store as the latest version, evicting old versions past the limits"""
+        with self._lock:
+            self._stores[store.version] = store
+            self._latest = store
+            self._evict()
+        return store
+
+    def _evict(self):
+        """Drop least recently used versions other than the latest until within the limits"""
+        sizes = {version: store.memory_usage() for version, store in self._stores.items()}
+        total = sum(sizes.values())
+        while len(self._stores) > 1 and (len(self._stores) > self.max_versions or total > self.max_bytes):
+            version = next(v for v in self._stores if v != self._latest.version)
+            self._stores.pop(version).evicted = True
+            total -= sizes[version]
+
+    def versions(self):
+        with self._lock:
+            return list(self._stores)
+
+    def memory_usage(self):
+        """Bytes held by the cached snapshots and the session views on them"""
+        with self._lock:
+            stores = list(self._stores.values())
+        return sum(store.memory_usage() for store in stores)
+
+_cache = ShipmentStoreCache()
+_store_lock = threading.Lock()
+
+def _default_data():
+    """First snapshot, built the same way as background refreshes"""
+    from data.refresh_worker import build_snapshot
+    return build_snapshot()
+
+def get_shipment_cache():
+    """Process-wide snapshot cache"""
+    return _cache
+
+def get_shipment_store():
+    """Latest process-wide shipment store, built on first use"""
+    store = _cache.latest
+    if store is None:
+        with _store_lock:
+            store = _cache.latest
+            if store is None:
+                store = _cache.publish(ShipmentStore(_default_data()).warm())
+    return store
+
+def set_shipment_store(data, refreshed_at=None):
+    """Publish a new shared table; sessions pick it up on their next view
+
+    The snapshot, including its KPIs, cube and index, is built completely
+    before it becomes the cache's latest version.
+    """
+    with _store_lock:
+        previous = _cache.latest
+        if previous is None:
+            store = ShipmentStore(data, refreshed_at=refreshed_at)
+        else:
+            # Keep allocating after every ID ever handed out
+            store = ShipmentStore(
+                data, version=previous.version + 1, id_allocator=previous.id_allocator, refreshed_at=refreshed_at
+            )
+        return _cache.publish(store.warm())
+
+def ensure_session_shipments(session_state):
+    """Attach a session view to session_state and return it
+
+    A session without edits always reads the latest store. A session with
+    edits keeps its version until the cache evicts it, then its edits are
+    replayed onto the latest store.
+    """
+    store = get_shipment_store()
+    view = session_state.get('shipments')
+    if view is None or (view.store is not store and not view.has_edits):
+        view = SessionShipments(store)
+        session_state['shipments'] = view
+    elif view.store.evicted:
+        view = view.rebase(store)
+        session_state['shipments'] = view
+    else:
+        _cache.touch(view.store)
+    return view
@@ -1,15 +1,21 @@
 import streamlit as st
-import folium
-from streamlit_folium import folium_static
+from utils.lazy_imports import lazy_import
 from utils.viz_utils import create_shipment_map
 from utils.data_utils import filter_shipments
+from utils.grid_utils import render_shipment_grid
 from utils.llm_utils import analyze_shipment_status
 import json
+from utils.instrumentation import script_run
+
+streamlit_folium = lazy_import('streamlit_folium')
 
 def render_tracking_page():
     st.title("📍 Shipment Tracking")
     # Notification settings removed from sidebar
 
+    from data.shipment_store import ensure_session_shipments
+    index = ensure_session_shipments(st.session_state).index()
+
     # Filters Section
     with st.expander("📊 Filter Shipments", expanded=False):
         col1, col2, col3 = st.columns(3)
@@ -17,38 +23,36 @@ def render_tracking_page():
         with col1:
             origin_filter = st.selectbox(
                 "Filter by Origin",
-                options=['All'] + sorted(st.session_state.shipment_data['origin'].unique().tolist())
+                options=['All'] + index.distinct('origin')
             )
 
         with col2:
             destination_filter = st.selectbox(
                 "Filter by Destination",
-                options=['All'] + sorted(st.session_state.shipment_data['destination'].unique().tolist())
+                options=['All'] + index.distinct('destination')
             )
 
         with col3:
             status_filter = st.selectbox(
                 "Filter by Status",
-                options=['All'] + sorted(st.session_state.shipment_data['status'].unique().tolist())
+                options=['All'] + index.distinct('status')
             )
 
     # Apply filters
-    filtered_data = st.session_state.shipment_data.copy()
-    if origin_filter != 'All':
-        filtered_data = filtered_data[filtered_data['origin'] == origin_filter]
-    if destination_filter != 'All':
-        filtered_data = filtered_data[filtered_data['destination'] == destination_filter]
-    if status_filter != 'All':
-        filtered_data = filtered_data[filtered_data['status'] == status_filter]
+    filters = {
+        'origin': None if origin_filter == 'All' else origin_filter,
+        'destination': None if destination_filter == 'All' else destination_filter,
+        'status': None if status_filter == 'All' else status_filter
+    }
 
     # Shipment ID Search
     shipment_id = st.text_input("Enter Shipment ID")
 
     if shipment_id:
-        shipment = filtered_data[filtered_data['shipment_id'] == shipment_id]
+        position = index.lookup(shipment_id, **filters)
 
-        if not shipment.empty:
-            shipment = shipment.iloc[0]
+        if position is not None:
+            shipment = index.take([position]).iloc[0]
 
             # Get AI analysis
             with st.spinner("Analyzing shipment status..."):
@@ -91,18 +95,18 @@ def render_tracking_page():
             # Map
             st.subheader("Route Map")
             shipment_map = create_shipment_map(shipment.to_frame().T)
-            folium_static(shipment_map)
+            streamlit_folium.folium_static(shipment_map)
         else:
             st.error("Shipment not found")
 
     # All Active Shipments with applied filters
-    st.subheader(f"Shipments ({len(filtered_data)} results)")
-    st.dataframe(
-        filtered_data[
-            ['shipment_id', 'origin', 'destination', 'status', 'predicted_delay']
-        ],
-        use_container_width=True
+    st.subheader(f"Shipments ({index.count(**filters):,} results)")
+    render_shipment_grid(
+        index,
+        filters,
+        columns=['shipment_id', 'origin', 'destination', 'status', 'predicted_delay']
     )
 
 if __name__ == "__main__":
-    render_tracking_page()
\ No newline at end of file
+    with script_run('shipment_tracking', st.session_state):
+        render_tracking_page()
@@ -1,16 +1,23 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.ml_utils import DelayPredictor
+from utils.model_registry import get_predictor
 from utils.viz_utils import create_delay_histogram
 from datetime import datetime, timedelta
 from utils.llm_utils import generate_delay_insights
+from utils.geo_utils import get_city_registry
+from utils.lazy_imports import lazy_import
+from utils.instrumentation import script_run
+
+px = lazy_import('plotly.express')
 
 def render_predictions_page():
     st.title("🔮 Delay Predictions")
 
-    # Initialize ML model
-    predictor = DelayPredictor()
+    from data.shipment_store import ensure_session_shipments
+    shipments = ensure_session_shipments(st.session_state)
+
+    # Load the shared, already-trained model
+    predictor = get_predictor()
 
     # New Shipment Prediction
     st.subheader("Predict Delay for New Shipment")
@@ -20,7 +27,7 @@ def render_predictions_page():
     with col1:
         origin = st.selectbox(
             "Origin",
-            options=['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
+            options=get_city_registry().names
         )
         departure_time = st.time_input("Departure Time")
         distance = st.number_input("Distance (km)", min_value=100, max_value=3000)
@@ -28,7 +35,7 @@ def render_predictions_page():
     with col2:
         destination = st.selectbox(
             "Destination",
-            options=['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
+            options=get_city_registry().names
         )
         weather = st.selectbox(
             "Weather Condition",
@@ -49,7 +56,9 @@ def render_predictions_page():
 
         # Get AI insights
         with st.spinner("Generating AI insights..."):
-            insights = generate_delay_insights(st.session_state.shipment_data)
+            insights = generate_delay_insights(
+                shipments.frame(['origin', 'destination', 'weather_condition', 'predicted_delay'])
+            )
             st.success("AI Analysis Complete!")
             st.write("🤖 AI Insights:")
             st.write(insights)
@@ -59,14 +68,12 @@ def render_predictions_page():
 
     # Delay distribution
     delay_hist = create_delay_histogram(
-        st.session_state.shipment_data['predicted_delay']
+        shipments.frame(['predicted_delay'])['predicted_delay']
     )
     st.plotly_chart(delay_hist, use_container_width=True)
 
     # Weather impact analysis
-    weather_impact = st.session_state.shipment_data.groupby('weather_condition')[
-        'predicted_delay'
-    ].mean().round(2)
+    weather_impact = shipments.cube().rollup(['weather_condition'])['mean'].round(2)
 
     st.subheader("Weather Impact on Delays")
     fig = px.bar(
@@ -77,4 +84,5 @@ def render_predictions_page():
     st.plotly_chart(fig, use_container_width=True)
 
 if __name__ == "__main__":
-    render_predictions_page()
\ No newline at end of file
+    with script_run('predictions', st.session_state):
+        render_predictions_page()
@@ -1,13 +1,21 @@
 import streamlit as st
-import folium
-from streamlit_folium import folium_static
 from utils.ml_utils import optimize_route
+from utils.vrp_utils import plan_fleet_routes
 from utils.viz_utils import get_city_coords, create_shipment_map
 from utils.llm_utils import suggest_route_improvements
+from utils.geo_utils import get_city_registry
+from utils.lazy_imports import lazy_import
+from utils.instrumentation import script_run
+
+folium = lazy_import('folium')
+streamlit_folium = lazy_import('streamlit_folium')
 
 def render_route_optimization():
     st.title("🗺️ Route Optimization")
 
+    from data.shipment_store import ensure_session_shipments
+    shipments = ensure_session_shipments(st.session_state)
+
     # Route Planning
     st.subheader("Plan Optimal Route")
 
@@ -16,28 +24,30 @@ def render_route_optimization():
     with col1:
         origin = st.selectbox(
             "Origin",
-            options=['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix'],
+            options=get_city_registry().names,
             key='origin'
         )
 
     with col2:
         destination = st.selectbox(
             "Destination",
-            options=['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix'],
+            options=get_city_registry().names,
             key='dest'
         )
 
     # Waypoints
     waypoints = st.multiselect(
         "Add Waypoints",
-        options=['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
+        options=get_city_registry().names
     )
 
     if st.button("Optimize Route"):
         optimized_route, estimated_time = optimize_route(
             origin,
             destination,
-            waypoints
+            waypoints,
+            solver='local_search',
+            time_budget=1.0
         )
 
         # Create map with optimized route
@@ -72,7 +82,7 @@ def render_route_optimization():
 
         # Display results
         st.success(f"Estimated delivery time: {estimated_time:.1f} hours")
-        folium_static(m)
+        streamlit_folium.folium_static(m)
 
         # Get AI-powered route suggestions
         with st.spinner("Analyzing route for improvements..."):
@@ -84,15 +94,66 @@ def render_route_optimization():
             st.subheader("🤖 AI Route Analysis")
             st.write(route_suggestions)
 
+    # Fleet Planning
+    st.subheader("Plan Fleet Routes")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        depot = st.selectbox(
+            "Depot",
+            options=get_city_registry().names,
+            key='depot'
+        )
+
+    with col2:
+        n_vehicles = st.number_input("Vehicles", min_value=1, max_value=500, value=5)
+
+    with col3:
+        vehicle_capacity = st.number_input("Capacity (shipments per vehicle)", min_value=1, value=20)
+
+    if st.button("Plan Fleet"):
+        pending = shipments.where(lambda frame: frame['status'] != 'Delivered').assign(demand=1)
+
+        with st.spinner("Planning fleet routes..."):
+            plan = plan_fleet_routes(
+                depot,
+                [vehicle_capacity] * n_vehicles,
+                pending,
+                time_budget=3.0
+            )
+
+        st.success(
+            f"{len(plan['routes'])} vehicles, "
+            f"{plan['total_distance_km']:,.0f} km total"
+        )
+        if plan['unassigned']:
+            st.warning(f"{len(plan['unassigned'])} shipments could not be assigned to a vehicle")
+
+        st.dataframe(
+            [
+                {
+                    'vehicle': route['vehicle'] + 1,
+                    'load': route['load'],
+                    'stops': ' → '.join([depot] + route['stops'] + [depot]),
+                    'distance_km': round(route['distance_km'], 1),
+                    'estimated_time': round(route['estimated_time'], 1)
+                }
+                for route in plan['routes']
+            ],
+            use_container_width=True
+        )
+
     # Historical Routes Analysis
     st.subheader("Popular Routes Analysis")
 
-    popular_routes = st.session_state.shipment_data.groupby(
+    popular_routes = shipments.cube().rollup(
         ['origin', 'destination']
-    ).size().reset_index(name='count')
+    )['count'].reset_index()
     popular_routes = popular_routes.sort_values('count', ascending=False).head(5)
 
     st.dataframe(popular_routes, use_container_width=True)
 
 if __name__ == "__main__":
-    render_route_optimization()
\ No newline at end of file
+    with script_run('route_optimization', st.session_state):
+        render_route_optimization()
@@ -1,19 +1,21 @@
 import streamlit as st
-import plotly.express as px
-from utils.data_utils import calculate_performance_metrics, get_weather_impact
 from utils.viz_utils import create_performance_timeline
 from datetime import datetime, timedelta
 import pandas as pd
+from utils.lazy_imports import lazy_import
+from utils.instrumentation import script_run
+
+px = lazy_import('plotly.express')
 
 def render_analytics_page():
     st.title("📊 Performance Analytics")
 
     # Initialize session state if needed
-    if 'shipment_data' not in st.session_state:
-        from data.mock_shipments import generate_mock_data
-        st.session_state.shipment_data = generate_mock_data()
+    from data.shipment_store import ensure_session_shipments
+    shipments = ensure_session_shipments(st.session_state)
 
-    metrics = calculate_performance_metrics(st.session_state.shipment_data)
+    metrics = shipments.kpis()
+    cube = shipments.cube()
 
     # Display KPIs
     st.subheader("Key Performance Indicators")
@@ -30,12 +32,13 @@ def render_analytics_page():
 
     # Performance Timeline
     st.subheader("Performance Timeline")
-    timeline = create_performance_timeline(st.session_state.shipment_data)
+    daily = cube.rollup(['day']).reset_index()
+    timeline = create_performance_timeline(daily, x='day', y='mean')
     st.plotly_chart(timeline, use_container_width=True)
 
     # Weather Impact Analysis
     st.subheader("Weather Impact Analysis")
-    weather_impact = get_weather_impact(st.session_state.shipment_data)
+    weather_impact = cube.rollup(['weather_condition'])[['mean', 'count']].round(2)
 
     fig = px.bar(
         weather_impact,
@@ -46,18 +49,14 @@ def render_analytics_page():
 
     # Route Performance Analysis
     st.subheader("Route Performance")
-    route_performance = st.session_state.shipment_data.groupby(
-        ['origin', 'destination']
-    )['predicted_delay'].agg(['mean', 'count']).round(2).reset_index()
+    route_performance = cube.rollup(['origin', 'destination'])[['mean', 'count']].round(2).reset_index()
 
     route_performance = route_performance.sort_values('mean', ascending=False)
     st.dataframe(route_performance, use_container_width=True)
 
     # Historical Trend Analysis
     st.subheader("Historical Trend Analysis")
-    trend_data = st.session_state.shipment_data.copy()
-    trend_data['date'] = pd.to_datetime(trend_data['departure_time']).dt.date
-    daily_delays = trend_data.groupby('date')['predicted_delay'].mean().reset_index()
+    daily_delays = daily.rename(columns={'day': 'date', 'mean': 'predicted_delay'})
 
     fig_trend = px.line(
         daily_delays, 
@@ -92,4 +91,5 @@ def render_analytics_page():
         )
 
 if __name__ == "__main__":
-    render_analytics_page()
\ No newline at end of file
+    with script_run('analytics', st.session_state):
+        render_analytics_page()
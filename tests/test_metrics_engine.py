@@ -0,0 +1,27 @@
+import numpy as np
+
+from data.mock_shipments import generate_mock_data
+from data.shipment_store import SessionShipments, ShipmentStore
+
+
+def test_incremental_kpis_match_a_full_recompute_with_missing_delays():
+    data = generate_mock_data(300, seed=4)
+    data.loc[data.index[::7], 'predicted_delay'] = np.nan
+    view = SessionShipments(ShipmentStore(data))
+
+    added = generate_mock_data(20, seed=5).assign(shipment_id=None)
+    added.loc[added.index[::3], 'predicted_delay'] = np.nan
+    view.append(added)
+    ids = view.frame()['shipment_id'].tolist()
+    view.update(ids[0], predicted_delay=float('nan'))
+    view.update(ids[30], predicted_delay=5.0, status='Delivered')
+    view.update(ids[35], predicted_delay=float('nan'))
+
+    frame = view.frame()
+    delays = frame['predicted_delay'].dropna()
+    kpis = view.kpis()
+    assert kpis['total_shipments'] == len(frame)
+    assert kpis['active_shipments'] == int((frame['status'] != 'Delivered').sum())
+    assert kpis['delayed_shipments'] == int((delays > 2).sum())
+    assert np.isclose(kpis['on_time_rate'], (delays <= 2).mean() * 100)
+    assert np.isclose(kpis['avg_delay'], delays.mean(), rtol=1e-5)
@@ -0,0 +1,23 @@
+import numpy as np
+
+from data.mock_shipments import generate_mock_data
+from data.shipment_store import compact_shipments
+from utils.report_utils import _format_cell, write_pdf_report
+
+
+def test_missing_values_render_as_blank_cells():
+    assert _format_cell(None) == ''
+    assert _format_cell(float('nan')) == ''
+    assert _format_cell(compact_shipments(generate_mock_data(1)).assign(departure_time=None)['departure_time'][0]) == ''
+
+
+def test_report_with_missing_values_is_written(tmp_path):
+    data = compact_shipments(generate_mock_data(50, seed=2))
+    data.loc[data.index[::5], 'departure_time'] = None
+    data.loc[data.index[::4], 'predicted_delay'] = np.nan
+
+    path = write_pdf_report(data, str(tmp_path / 'report.pdf'))
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    assert content.startswith(b'%PDF') and b'nan' not in content and b'NaT' not in content
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from data.mock_shipments import generate_mock_data
+from data.shipment_store import ShipmentLog, SessionShipments, ShipmentStore
+
+
+def test_single_row_inserts_do_not_rebuild_added_rows(monkeypatch):
+    store = ShipmentStore(generate_mock_data(200, seed=0))
+    view = SessionShipments(store)
+    rows = generate_mock_data(300, seed=1).assign(shipment_id=None)
+
+    def fail(self):
+        raise AssertionError('insert materialized the added rows')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ShipmentLog, 'frame', fail)
+        ids = [view.append(rows.iloc[[i]])[0] for i in range(len(rows))]
+        view.update(ids[0], status='Delivered')
+        view.update(ids[150], predicted_delay=1.5)
+        assert len(view.added._pending) < ShipmentLog.CHUNK_BATCHES
+
+    assert len(set(ids)) == len(ids)
+    assert not set(ids) & set(store.data['shipment_id'])
+    frame = view.frame()
+    assert frame['shipment_id'].tolist()[:300] == ids[::-1]
+    edited = frame.set_index('shipment_id')
+    assert edited.loc[ids[0], 'status'] == 'Delivered'
+    assert edited.loc[ids[150], 'predicted_delay'] == 1.5
+
+
+def test_uploaded_ids_are_kept_unique():
+    store = ShipmentStore(generate_mock_data(100, seed=0))
+    view = SessionShipments(store)
+    upload = generate_mock_data(4, seed=1)
+    upload['shipment_id'] = ['SHP000100', 'SHP000101', 'SHP000005', 'SHP000100']
+
+    ids = view.append(upload)
+    ids += view.append(upload.assign(shipment_id=[None, 'SHP000101', 'custom-1', None]))
+
+    assert ids[:2] == ['SHP000100', 'SHP000101']
+    assert 'custom-1' in ids
+    assert len(set(ids)) == len(ids)
+    assert not set(ids) & set(store.data['shipment_id'])
+    assert pd.Index(view.frame()['shipment_id']).is_unique
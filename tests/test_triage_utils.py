@@ -0,0 +1,38 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from data.mock_shipments import generate_mock_data
+from utils.llm_client import AsyncLLMClient, ResponseCache
+from utils.triage_utils import triage_shipments
+
+
+class FakeCompletions:
+    """Chat completions stand-in that answers every shipment after a fixed latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def create(self, model, messages, response_format=None):
+        await asyncio.sleep(self.latency)
+        results = [
+            {'shipment_id': item['shipment_id'], 'risk_level': 'Medium',
+             'recommendation': 'Monitor', 'eta_confidence': 0.5}
+            for item in json.loads(messages[1]['content'])
+        ]
+        message = SimpleNamespace(content=json.dumps({'results': results}))
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=50)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_queued_batches_are_not_timed_out_while_waiting_for_a_slot():
+    client = AsyncLLMClient(max_concurrency=2, timeout=0.2, cache=ResponseCache(':memory:'))
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(latency=0.05)))
+    shipments = generate_mock_data(400, seed=3).assign(status='In Transit', weather_condition='Storm')
+
+    shipments, metrics = triage_shipments(shipments, batch_size=20, time_budget=30, client=client)
+
+    # 20 batches through 2 slots take about 0.5 s, longer than the per-call timeout
+    assert metrics['batches'] == 20
+    assert metrics['failed_batches'] == 0
+    assert (shipments['triage_source'] == 'llm').all()
@@ -0,0 +1,63 @@
+import time
+
+import pandas as pd
+
+from data.mock_shipments import CITIES, generate_mock_data
+from utils.vrp_utils import plan_fleet_routes
+
+
+def test_depot_city_shipments_are_assigned():
+    shipments = pd.DataFrame({
+        'destination': [CITIES[i % len(CITIES)] for i in range(60)],
+        'demand': 1
+    })
+    plan = plan_fleet_routes('New York', [20] * 5, shipments, time_budget=0.5, max_workers=1)
+
+    assert plan['unassigned'] == []
+    assert sum(route['load'] for route in plan['routes']) == len(shipments)
+
+
+def test_no_shipment_unassigned_when_capacity_suffices():
+    for seed in range(5):
+        data = generate_mock_data(400, seed=seed)
+        pending = data[data['status'] != 'Delivered'].head(60).assign(demand=1)
+        plan = plan_fleet_routes('New York', [20] * 5, pending, time_budget=0.5, max_workers=1)
+
+        assert plan['unassigned'] == []
+        assigned = [label for route in plan['routes'] for label in route['shipments']]
+        assert sorted(assigned) == sorted(pending.index)
+        assert all(route['load'] <= route['capacity'] for route in plan['routes'])
+
+
+def _assert_all_assigned(plan, shipments):
+    assert plan['unassigned'] == []
+    assigned = [label for route in plan['routes'] for label in route['shipments']]
+    assert sorted(assigned) == sorted(shipments.index)
+    assert all(route['load'] <= route['capacity'] for route in plan['routes'])
+    assert len({route['vehicle'] for route in plan['routes']}) == len(plan['routes'])
+
+
+def test_exact_fit_fleet_assigns_every_shipment():
+    shipments = generate_mock_data(60, seed=1).assign(demand=1)
+    for capacities in ([30, 30], [20] * 3, [10] * 6):
+        plan = plan_fleet_routes('New York', capacities, shipments, time_budget=0.5, max_workers=1)
+        _assert_all_assigned(plan, shipments)
+
+
+def test_mixed_capacity_fleet_assigns_every_shipment():
+    shipments = generate_mock_data(60, seed=2).assign(demand=1)
+    plan = plan_fleet_routes('New York', [50, 5, 5, 5], shipments, time_budget=0.5, max_workers=1)
+    _assert_all_assigned(plan, shipments)
+
+    shipments = generate_mock_data(40, seed=3).assign(demand=[1, 2, 3, 2] * 10)
+    plan = plan_fleet_routes('New York', [30, 25, 20, 15], shipments, time_budget=0.5, max_workers=1)
+    _assert_all_assigned(plan, shipments)
+
+
+def test_large_plan_fits_fleet_within_budget():
+    shipments = generate_mock_data(3000, seed=4).assign(demand=1)
+    start = time.perf_counter()
+    plan = plan_fleet_routes('New York', [100] * 30, shipments, time_budget=2.0, max_workers=2)
+
+    assert time.perf_counter() - start < 4.0
+    _assert_all_assigned(plan, shipments)
@@ -0,0 +1,16 @@
+from utils.weather_utils import StubWeatherProvider, WeatherService
+
+
+def test_callers_cannot_mutate_cached_weather():
+    provider = StubWeatherProvider()
+    service = WeatherService(provider)
+    try:
+        service.get('Houston')['condition'] = 'Clear'
+        service.get_many(['Houston', 'Chicago'])['Chicago']['temp'] = -40
+
+        assert service.get('Houston')['condition'] == 'Rain'
+        assert service.get_many(['Chicago'])['Chicago']['temp'] == 15
+        assert StubWeatherProvider.WEATHER_DATA['Houston']['condition'] == 'Rain'
+        assert provider.calls == 2
+    finally:
+        service.shutdown()
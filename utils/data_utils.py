@@ -1,39 +1,46 @@
 import pandas as pd
 from datetime import datetime, timedelta
+from utils.metrics_engine import KpiAggregator
+from utils.instrumentation import instrument
 
+@instrument()
 def calculate_performance_metrics(shipment_data):
-    """Calculate key performance metrics from shipment data"""
-    total_shipments = len(shipment_data)
-    delayed_shipments = len(shipment_data[shipment_data['predicted_delay'] > 2])
-    on_time_rate = (total_shipments - delayed_shipments) / total_shipments * 100
-    
-    metrics = {
-        'total_shipments': total_shipments,
-        'delayed_shipments': delayed_shipments,
-        'on_time_rate': on_time_rate,
-        'avg_delay': shipment_data['predicted_delay'].mean()
-    }
-    return metrics
+    """Calculate key performance metrics from shipment data
+
+    Uses the same definitions as the incremental KPIs in metrics_engine;
+    prefer SessionShipments.kpis() when a session view is available.
+    """
+    return KpiAggregator.from_frame(shipment_data).snapshot()
+
+def shipment_filter_mask(shipment_data, status=None, date_range=None):
+    """Boolean mask of shipments matching the criteria, or None for no filter"""
+    mask = None
 
-def filter_shipments(shipment_data, status=None, date_range=None):
-    """Filter shipment data based on criteria"""
-    filtered_data = shipment_data.copy()
-    
     if status:
-        filtered_data = filtered_data[filtered_data['status'] == status]
-    
+        mask = (shipment_data['status'] == status).to_numpy()
+
     if date_range:
         start_date, end_date = date_range
-        filtered_data = filtered_data[
-            (filtered_data['departure_time'] >= start_date) &
-            (filtered_data['departure_time'] <= end_date)
-        ]
-    
-    return filtered_data
+        in_range = (
+            (shipment_data['departure_time'] >= start_date) &
+            (shipment_data['departure_time'] <= end_date)
+        ).to_numpy()
+        mask = in_range if mask is None else mask & in_range
+
+    return mask
+
+@instrument()
+def filter_shipments(shipment_data, status=None, date_range=None):
+    """Filter shipment data based on criteria"""
+    mask = shipment_filter_mask(shipment_data, status, date_range)
+    if mask is None:
+        return shipment_data.copy()
+    return shipment_data[mask]
 
+@instrument()
 def get_weather_impact(shipment_data):
     """Analyze impact of weather on shipping delays"""
-    weather_impact = shipment_data.groupby('weather_condition')[
+    weather_impact = shipment_data.groupby('weather_condition', observed=True)[
         'predicted_delay'
     ].agg(['mean', 'count']).round(2)
     return weather_impact
@@ -1,38 +1,232 @@
-import pandas as pd
+import os
+import gzip
+import time
 import base64
-import io
-from datetime import datetime
+import tempfile
+import pandas as pd
+import numpy as np
+from utils.lazy_imports import lazy_import
+from utils.report_utils import generate_pdf_report, submit_pdf_report
+from utils.instrumentation import instrument
+
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+
+EXPORT_CHUNK_ROWS = 100000
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'smartlogistics_exports')
+EXPORT_TTL_SECONDS = 3600
+EXPORT_FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'CSV (gzip)': ('.csv.gz', 'application/gzip'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet')
+}
+
+def _export_chunks(df, columns=None, mask=None, chunk_size=EXPORT_CHUNK_ROWS):
+    """Yield projected, filtered slices of df without copying the whole frame"""
+    columns = list(columns) if columns else list(df.columns)
+    if mask is None:
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size][columns]
+    else:
+        positions = np.flatnonzero(mask)
+        for start in range(0, len(positions), chunk_size):
+            yield df.iloc[positions[start:start + chunk_size]][columns]
+
+def _cleanup_exports(now=None):
+    """Remove export files older than EXPORT_TTL_SECONDS"""
+    now = now or time.time()
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > EXPORT_TTL_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+
+@instrument()
+def export_shipments(df, export_format='CSV', columns=None, mask=None, chunk_size=EXPORT_CHUNK_ROWS):
+    """Write df to a temporary CSV, gzip CSV or Parquet file in chunks
+
+    Parameters:
+    - df: Shipment DataFrame
+    - export_format: A key of EXPORT_FORMATS
+    - columns: Columns to export, all by default
+    - mask: Boolean row filter, e.g. from shipment_filter_mask
+    - chunk_size: Rows serialized at a time; bounds memory use
+
+    Returns:
+    - path: File path, to be served with st.download_button
+    - mime: MIME type of the file
+    """
+    suffix, mime = EXPORT_FORMATS[export_format]
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _cleanup_exports()
+    fd, path = tempfile.mkstemp(prefix='shipments_', suffix=suffix, dir=EXPORT_DIR)
+    os.close(fd)
+
+    chunks = _export_chunks(df, columns, mask, chunk_size)
+    if export_format == 'Parquet':
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            if writer is None:
+                # No matching rows: still write a valid file with the schema
+                empty = df.iloc[:0][list(columns) if columns else list(df.columns)]
+                pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), path)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        opener = gzip.open if export_format == 'CSV (gzip)' else open
+        with opener(path, 'wt', newline='') as f:
+            header = True
+            for chunk in chunks:
+                chunk.to_csv(f, index=False, header=header)
+                header = False
+            if header:
+                f.write(','.join(columns or df.columns) + '\n')
+
+    return path, mime
 
 def generate_csv_download_link(df):
-    """Generate a link to download the dataframe as CSV"""
+    """Generate a data-URI link to download a small dataframe as CSV
+
+    Holds the whole CSV in memory; use export_shipments for large tables.
+    """
     csv = df.to_csv(index=False)
     b64 = base64.b64encode(csv.encode()).decode()
     href = f'data:file/csv;base64,{b64}'
     return href
 
-def generate_pdf_report(df, report_type="shipments"):
-    """Generate a PDF report of the data"""
-    buffer = io.BytesIO()
-    
-    # Convert DataFrame to HTML for PDF
-    html = f"""
-    <h2>{report_type.title()} Report</h2>
-    <p>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-    {df.to_html()}
+REQUIRED_COLUMNS = ['origin', 'destination', 'departure_time']
+IMPORT_CHUNK_ROWS = 50000
+MAX_ERRORS_PER_CHUNK = 100
+CSV_STRING_COLUMNS = ['shipment_id', 'origin', 'destination', 'status', 'weather_condition']
+CSV_FLOAT_COLUMNS = ['distance_km', 'predicted_delay']
+CSV_DATE_COLUMNS = ['departure_time', 'estimated_arrival']
+CSV_COLUMNS = CSV_STRING_COLUMNS + CSV_FLOAT_COLUMNS + CSV_DATE_COLUMNS
+
+def validate_csv_header(uploaded_file):
+    """Check the header row only; returns an error message or None"""
+    try:
+        columns = pd.read_csv(uploaded_file, nrows=0).columns
+    except Exception as e:
+        return f"Error parsing CSV: {str(e)}"
+    finally:
+        uploaded_file.seek(0)
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing:
+        return "Missing required columns: origin, destination, departure_time"
+    return None
+
+def _coerce_chunk(chunk, first_line):
+    """Parse types for one chunk of string columns and split off bad rows
+
+    Returns the valid rows and a list of (line_number, reason) errors.
     """
-    
-    return html
+    bad = pd.Series(False, index=chunk.index)
+    reasons = pd.Series('', index=chunk.index, dtype=object)
+
+    for column in REQUIRED_COLUMNS:
+        empty = chunk[column].isna() | (chunk[column].str.strip() == '')
+        reasons[empty & ~bad] = f"missing {column}"
+        bad |= empty
+
+    for column in CSV_FLOAT_COLUMNS:
+        if column in chunk:
+            raw = chunk[column]
+            chunk[column] = pd.to_numeric(raw, errors='coerce')
+            invalid = raw.notna() & chunk[column].isna()
+            reasons[invalid & ~bad] = f"invalid {column}"
+            bad |= invalid
+
+    for column in CSV_DATE_COLUMNS:
+        if column in chunk:
+            raw = chunk[column]
+            chunk[column] = pd.to_datetime(raw, errors='coerce', format='mixed')
+            invalid = raw.notna() & chunk[column].isna()
+            reasons[invalid & ~bad] = f"invalid {column}"
+            bad |= invalid
+
+    errors = [
+        (first_line + int(position), reason)
+        for position, reason in zip(
+            np.flatnonzero(bad.to_numpy())[:MAX_ERRORS_PER_CHUNK],
+            reasons[bad].iloc[:MAX_ERRORS_PER_CHUNK]
+        )
+    ]
+    return chunk[~bad], errors
+
+def iter_uploaded_csv(uploaded_file, chunk_size=IMPORT_CHUNK_ROWS):
+    """Stream an uploaded CSV in chunks
+
+    Yields (valid_rows, report) per chunk. Only known shipment columns are
+    read, all as strings, then coerced to numbers and datetimes. Rows that
+    fail are reported by line number instead of aborting the import.
+    """
+    reader = pd.read_csv(
+        uploaded_file,
+        chunksize=chunk_size,
+        usecols=lambda column: column in CSV_COLUMNS,
+        dtype=str,
+        keep_default_na=True
+    )
+    first_line = 2  # Line 1 is the header
+    for index, chunk in enumerate(reader):
+        valid, errors = _coerce_chunk(chunk, first_line)
+        yield valid, {
+            'chunk': index,
+            'rows_read': len(chunk),
+            'rows_valid': len(valid),
+            'errors': errors
+        }
+        first_line += len(chunk)
+
+@instrument()
+def import_uploaded_csv(uploaded_file, sink, chunk_size=IMPORT_CHUNK_ROWS, progress=None):
+    """Stream an uploaded CSV into sink(valid_rows) chunk by chunk
+
+    Memory is bounded by one raw chunk plus whatever sink keeps, e.g.
+    compacted chunks staged until the import succeeds; progress(fraction)
+    is called after each chunk when the upload size is known.
+
+    Returns:
+    - summary: Dict with rows_read, rows_imported, chunks, errors and, if
+      reading stopped early, a fatal error message
+    """
+    summary = {'rows_read': 0, 'rows_imported': 0, 'chunks': 0, 'errors': [], 'fatal': None}
+    total_bytes = getattr(uploaded_file, 'size', None)
+
+    error = validate_csv_header(uploaded_file)
+    if error:
+        summary['fatal'] = error
+        return summary
 
-def parse_uploaded_csv(uploaded_file):
-    """Parse uploaded CSV file and validate data"""
     try:
-        df = pd.read_csv(uploaded_file)
-        required_columns = ['origin', 'destination', 'departure_time']
-        
-        # Validate columns
-        if not all(col in df.columns for col in required_columns):
-            return None, "Missing required columns: origin, destination, departure_time"
-        
-        return df, None
+        for valid, report in iter_uploaded_csv(uploaded_file, chunk_size):
+            if len(valid):
+                sink(valid)
+            summary['rows_read'] += report['rows_read']
+            summary['rows_imported'] += report['rows_valid']
+            summary['chunks'] += 1
+            summary['errors'].extend(report['errors'])
+            if progress and total_bytes:
+                progress(min(uploaded_file.tell() / total_bytes, 1.0))
     except Exception as e:
-        return None, f"Error parsing CSV: {str(e)}"
+        summary['fatal'] = f"Error parsing CSV after {summary['rows_read']} rows: {str(e)}"
+    return summary
+
+def parse_uploaded_csv(uploaded_file):
+    """Parse uploaded CSV file and validate data"""
+    chunks = []
+    summary = import_uploaded_csv(uploaded_file, chunks.append)
+    if summary['fatal']:
+        return None, summary['fatal']
+    if not chunks:
+        return None, "No valid shipment rows found"
+    return pd.concat(chunks, ignore_index=True), None
@@ -0,0 +1,164 @@
+import threading
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_COORDS = [39.8283, -98.5795]  # US center, used for unknown cities
+MATRIX_MAX_CITIES = 5000  # Above this, distances are computed on demand
+
+CITY_COORDS = {
+    'New York': [40.7128, -74.0060],
+    'Los Angeles': [34.0522, -118.2437],
+    'Chicago': [41.8781, -87.6298],
+    'Houston': [29.7604, -95.3698],
+    'Phoenix': [33.4484, -112.0740],
+    'Philadelphia': [39.9526, -75.1652],
+    'San Antonio': [29.4241, -98.4936],
+    'San Diego': [32.7157, -117.1611],
+    'Dallas': [32.7767, -96.7970],
+    'San Jose': [37.3382, -121.8863]
+}
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in kilometers"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+class CityRegistry:
+    """Integer-indexed city coordinates with a precomputed distance matrix
+
+    Cities get stable integer IDs in insertion order. Coordinates live in
+    NumPy arrays with one trailing row for unknown cities, so any name can
+    be resolved to an ID without branching.
+    """
+
+    def __init__(self, coords=None):
+        self._lock = threading.Lock()
+        self.names = []
+        self._ids = {}  # Name to ID for scalar lookups
+        self._index = pd.Index([], dtype=object)  # Vectorized lookups
+        self.lat = np.array([DEFAULT_COORDS[0]])
+        self.lon = np.array([DEFAULT_COORDS[1]])
+        self._matrix = None
+        self.add_cities(coords if coords is not None else CITY_COORDS)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def unknown_id(self):
+        return len(self.names)
+
+    def add_cities(self, coords):
+        """Register new cities, extending the distance matrix incrementally"""
+        with self._lock:
+            new = [(name, latlon) for name, latlon in coords.items() if name not in self._ids]
+            if not new:
+                return
+
+            n_old = len(self.names)
+            names = self.names + [name for name, _ in new]
+            new_lat = np.array([latlon[0] for _, latlon in new], dtype=np.float64)
+            new_lon = np.array([latlon[1] for _, latlon in new], dtype=np.float64)
+            lat = np.concatenate([self.lat[:n_old], new_lat, [DEFAULT_COORDS[0]]])
+            lon = np.concatenate([self.lon[:n_old], new_lon, [DEFAULT_COORDS[1]]])
+
+            matrix = None
+            if self._matrix is not None and len(names) <= MATRIX_MAX_CITIES:
+                # Reuse the known block and only compute rows for the new cities
+                matrix = np.empty((len(lat), len(lat)), dtype=np.float32)
+                matrix[:n_old, :n_old] = self._matrix[:n_old, :n_old]
+                fresh = haversine_km(
+                    lat[:, None], lon[:, None], lat[None, n_old:], lon[None, n_old:]
+                ).astype(np.float32)
+                matrix[:, n_old:] = fresh
+                matrix[n_old:, :] = fresh.T
+
+            self.names = names
+            self._ids = {name: i for i, name in enumerate(names)}
+            self._index = pd.Index(names)
+            self.lat = lat
+            self.lon = lon
+            self._matrix = matrix
+
+    def city_id(self, city):
+        """Integer ID of a city, or unknown_id"""
+        return self._ids.get(city, len(self.names))
+
+    def city_ids(self, cities):
+        """Vectorized city name to ID lookup"""
+        if isinstance(getattr(cities, 'dtype', None), pd.CategoricalDtype):
+            # Resolve each category once, then gather by code
+            category_ids = self._index.get_indexer(cities.cat.categories)
+            category_ids = np.append(category_ids, -1)
+            ids = category_ids[cities.cat.codes.to_numpy()]
+        else:
+            ids = self._index.get_indexer(np.asarray(cities, dtype=object))
+        ids[ids < 0] = self.unknown_id
+        return ids
+
+    def coords(self, city):
+        """[lat, lon] for a city, defaulting to the US center"""
+        city_id = self.city_id(city)
+        return [float(self.lat[city_id]), float(self.lon[city_id])]
+
+    @property
+    def distance_matrix(self):
+        """Symmetric haversine distances in km between all cities, built once"""
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    if len(self.names) > MATRIX_MAX_CITIES:
+                        raise ValueError(
+                            f"Distance matrix disabled above {MATRIX_MAX_CITIES} cities; "
+                            "use pairwise_distances instead"
+                        )
+                    self._matrix = haversine_km(
+                        self.lat[:, None], self.lon[:, None],
+                        self.lat[None, :], self.lon[None, :]
+                    ).astype(np.float32)
+        return self._matrix
+
+    def submatrix(self, ids):
+        """Distances between the given city IDs"""
+        ids = np.asarray(ids)
+        if len(self.names) <= MATRIX_MAX_CITIES:
+            return self.distance_matrix[np.ix_(ids, ids)]
+        return haversine_km(
+            self.lat[ids][:, None], self.lon[ids][:, None],
+            self.lat[ids][None, :], self.lon[ids][None, :]
+        )
+
+    def distance(self, city1, city2):
+        """Distance in km between two city names"""
+        i, j = self.city_id(city1), self.city_id(city2)
+        if len(self.names) <= MATRIX_MAX_CITIES:
+            return float(self.distance_matrix[i, j])
+        return float(haversine_km(self.lat[i], self.lon[i], self.lat[j], self.lon[j]))
+
+    def pairwise_distances(self, origins, destinations):
+        """Element-wise distances in km for aligned origin/destination sequences"""
+        origin_ids = self.city_ids(origins)
+        dest_ids = self.city_ids(destinations)
+        if len(self.names) <= MATRIX_MAX_CITIES:
+            return self.distance_matrix[origin_ids, dest_ids]
+        return haversine_km(
+            self.lat[origin_ids], self.lon[origin_ids],
+            self.lat[dest_ids], self.lon[dest_ids]
+        )
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_city_registry():
+    """Process-wide city registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CityRegistry()
+    return _registry
@@ -0,0 +1,59 @@
+import math
+import streamlit as st
+
+GRID_PAGE_SIZES = [25, 50, 100, 250]
+
+def render_shipment_grid(index, filters=None, columns=None, key='shipment_grid', page_size=50):
+    """Paginated, sortable table over a ShipmentIndex
+
+    Only the visible page is sliced out of the frame and sent to the
+    browser; sorting and counts come from the index.
+
+    Parameters:
+    - index: ShipmentIndex to page through
+    - filters: column=value filters passed to index.page
+    - columns: Columns to display, defaults to all
+    - key: Widget key prefix, unique per grid on a page
+    - page_size: Initial rows per page
+
+    Returns:
+    - total: Number of rows matching the filters
+    """
+    columns = columns or index.columns
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_by = st.selectbox("Sort by", ['(none)'] + columns, key=f'{key}_sort')
+    with col2:
+        descending = st.toggle("Descending", key=f'{key}_descending')
+    with col3:
+        page_size = st.selectbox(
+            "Rows per page",
+            GRID_PAGE_SIZES,
+            index=GRID_PAGE_SIZES.index(page_size) if page_size in GRID_PAGE_SIZES else 0,
+            key=f'{key}_page_size'
+        )
+
+    total = index.count(**(filters or {}))
+    pages = max(math.ceil(total / page_size), 1)
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f'{key}_page')
+    page = min(page, pages)
+
+    positions, total = index.page(
+        filters,
+        sort_by=None if sort_by == '(none)' else sort_by,
+        ascending=not descending,
+        offset=(page - 1) * page_size,
+        limit=page_size
+    )
+    st.dataframe(
+        index.take(positions)[columns],
+        use_container_width=True,
+        hide_index=True
+    )
+    if total:
+        start = (page - 1) * page_size
+        st.caption(f"Showing {start + 1:,}–{start + len(positions):,} of {total:,} shipments")
+    else:
+        st.caption("No shipments match the filters")
+    return total
@@ -0,0 +1,241 @@
+import os
+import time
+import json
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from utils.lazy_imports import lazy_import
+
+st = lazy_import('streamlit')
+
+METRIC_PREFIX = 'smartlogistics'
+DEBUG_PANEL_SPANS = 15  # Rows shown in the sidebar debug panel
+# Set to show the debug panel in every session; ?debug=1 enables it per page view
+DEBUG_ENV = 'SMARTLOGISTICS_DEBUG'
+# Prometheus textfile-collector path rewritten after each script run
+METRICS_FILE_ENV = 'SMARTLOGISTICS_METRICS_FILE'
+
+class SpanStats:
+    """Call and error counts and total and max duration of one span name"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, seconds, failed=False):
+        self.calls += 1
+        self.errors += failed
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+class Recorder:
+    """
+    Process-wide span timings and counters. Spans also land in the
+    current script run, if one is open in this context, so a single
+    rerun can be broken down on its own.
+    """
+
+    def __init__(self):
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record_span(self, name, seconds, failed=False):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(seconds, failed)
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def to_json(self):
+        """Aggregates as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'spans': {
+                    name: {
+                        'calls': stats.calls,
+                        'errors': stats.errors,
+                        'total_seconds': stats.total_seconds,
+                        'max_seconds': stats.max_seconds
+                    }
+                    for name, stats in self.spans.items()
+                },
+                'counters': dict(self.counters)
+            }
+
+    def prometheus_text(self):
+        """Aggregates in the Prometheus text exposition format"""
+        data = self.to_json()
+        lines = []
+
+        def family(metric, kind, help_text, samples):
+            lines.append(f'# HELP {METRIC_PREFIX}_{metric} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{metric} {kind}')
+            for label, value in samples:
+                lines.append(f'{METRIC_PREFIX}_{metric}{{{label}}} {value}')
+
+        spans = sorted(data['spans'].items())
+        family('span_calls_total', 'counter', 'Calls per instrumented span',
+               [(f'span="{name}"', stats['calls']) for name, stats in spans])
+        family('span_errors_total', 'counter', 'Calls per span that raised',
+               [(f'span="{name}"', stats['errors']) for name, stats in spans])
+        family('span_seconds_total', 'counter', 'Total seconds spent per span',
+               [(f'span="{name}"', f"{stats['total_seconds']:.6f}") for name, stats in spans])
+        family('span_seconds_max', 'gauge', 'Slowest single call per span',
+               [(f'span="{name}"', f"{stats['max_seconds']:.6f}") for name, stats in spans])
+        family('events_total', 'counter', 'Instrumentation counters',
+               [(f'name="{name}"', value) for name, value in sorted(data['counters'].items())])
+        return '\n'.join(lines) + '\n'
+
+_recorder = Recorder()
+# (run start time, list of span dicts) for the script run open in this context
+_current_run = contextvars.ContextVar('instrumentation_run', default=None)
+_depth = contextvars.ContextVar('instrumentation_depth', default=0)
+
+def get_recorder():
+    """Process-wide recorder shared by every session"""
+    return _recorder
+
+@contextmanager
+def span(name):
+    """Time a block under name"""
+    run = _current_run.get()
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _depth.reset(token)
+        _recorder.record_span(name, seconds, failed)
+        if run is not None:
+            run[1].append({
+                'span': name,
+                'start': start - run[0],
+                'seconds': seconds,
+                'depth': depth,
+                'failed': failed
+            })
+
+def instrument(name=None):
+    """Decorator timing every call of a function as a span
+
+    The span name defaults to module.qualname, e.g.
+    ml_utils.DelayPredictor.predict_delay.
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def incr(name, value=1):
+    """Add to a process-wide counter"""
+    _recorder.incr(name, value)
+
+def summarize_run(spans, limit=None):
+    """Per-span totals of one run, slowest first"""
+    totals = {}
+    for item in spans:
+        entry = totals.setdefault(
+            item['span'], {'span': item['span'], 'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+        )
+        entry['calls'] += 1
+        entry['seconds'] += item['seconds']
+        entry['max_seconds'] = max(entry['max_seconds'], item['seconds'])
+    summary = sorted(totals.values(), key=lambda entry: -entry['seconds'])
+    return summary[:limit] if limit else summary
+
+def debug_enabled():
+    """Whether to draw the debug panel for this run"""
+    if os.environ.get(DEBUG_ENV):
+        return True
+    try:
+        return st.query_params.get('debug') == '1'
+    except Exception:
+        return False
+
+def render_debug_panel(run):
+    """Sidebar table of the slowest spans of a run, with metric downloads"""
+    with st.sidebar.expander("🐞 Debug: slowest spans", expanded=False):
+        st.caption(f"{run['name']}: {run['seconds'] * 1000:.0f} ms, {len(run['spans'])} spans")
+        rows = summarize_run(run['spans'], DEBUG_PANEL_SPANS)
+        if rows:
+            st.dataframe(
+                [
+                    {
+                        'span': row['span'],
+                        'calls': row['calls'],
+                        'total ms': round(row['seconds'] * 1000, 1),
+                        'max ms': round(row['max_seconds'] * 1000, 1)
+                    }
+                    for row in rows
+                ],
+                hide_index=True
+            )
+        else:
+            st.write("No instrumented calls in this run")
+        st.download_button(
+            "Process metrics (Prometheus)",
+            _recorder.prometheus_text(),
+            'metrics.prom',
+            'text/plain'
+        )
+        st.download_button(
+            "Process metrics (JSON)",
+            json.dumps(_recorder.to_json(), indent=2),
+            'metrics.json',
+            'application/json'
+        )
+
+def _write_metrics_file(path):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(_recorder.prometheus_text())
+    os.replace(tmp_path, path)
+
+@contextmanager
+def script_run(name, session_state=None):
+    """Collect the spans of one Streamlit script run
+
+    After a run that completes, it is stored in session_state['last_run'],
+    the debug panel is drawn when enabled, and the metrics file is
+    refreshed if configured.
+    """
+    run = (time.perf_counter(), [])
+    with span(f'script.{name}'):
+        token = _current_run.set(run)
+        try:
+            yield run[1]
+        finally:
+            _current_run.reset(token)
+
+    result = {'name': name, 'seconds': time.perf_counter() - run[0], 'spans': run[1]}
+    if session_state is not None:
+        session_state['last_run'] = result
+        if debug_enabled():
+            render_debug_panel(result)
+    metrics_file = os.environ.get(METRICS_FILE_ENV)
+    if metrics_file:
+        _write_metrics_file(metrics_file)
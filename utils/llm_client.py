@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from utils.instrumentation import incr
+
+LLM_MODEL = "gpt-4o"
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', 30))
+LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', 24 * 3600))
+LLM_CACHE_PATH = os.environ.get(
+    'LLM_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'llm_cache.sqlite')
+)
+
+def prompt_key(model, messages, response_format=None):
+    """Hash of a request with whitespace normalized, used as the cache key"""
+    normalized = {
+        'model': model,
+        'messages': [
+            {'role': m['role'], 'content': re.sub(r'\s+', ' ', m['content']).strip()}
+            for m in messages
+        ],
+        'response_format': response_format
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+class ResponseCache:
+    """Persistent SQLite cache of LLM responses with a TTL"""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, content TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def set(self, key, content):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created) VALUES (?, ?, ?)",
+                (key, content, time.time())
+            )
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            )
+
+class AsyncLLMClient:
+    """
+    Async chat completion client with a concurrency limit, per-call
+    timeout/deadline and a persistent response cache.
+
+    All requests run on one background event loop, so the semaphore limits
+    concurrency for the whole process rather than per Streamlit session.
+    base_url lets a local mock server stand in for the API.
+    """
+
+    def __init__(self, model=LLM_MODEL, base_url=None, api_key=None,
+                 max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT_SECONDS, cache=None):
+        self.model = model
+        self.base_url = base_url or os.environ.get('LLM_BASE_URL')
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = cache if cache is not None else ResponseCache()
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _get_loop(self):
+        """Start the background event loop on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='llm-client', daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def complete(self, messages, response_format=None, timeout=None, deadline=None, validate=None):
+        """Return the completion text for messages, from cache when possible
+
+        Must run on the client's own loop (see submit). timeout bounds the
+        request itself, from when it gets a semaphore slot; deadline is an
+        absolute time.monotonic() value shared by a batch of calls and also
+        covers waiting for a slot, so queued calls are not cut short early.
+        validate(content) decides whether a fresh reply is cached: rejected
+        replies are still returned but requested again next time.
+        """
+        content, _ = await self.complete_with_usage(messages, response_format, timeout, deadline, validate)
+        return content
+
+    async def complete_with_usage(self, messages, response_format=None, timeout=None, deadline=None,
+                                  validate=None):
+        """Like complete, but also return token usage (zero for cache hits)"""
+        key = prompt_key(self.model, messages, response_format)
+        cached = self.cache.get(key)
+        if cached is not None:
+            incr('llm.cache_hits')
+            return cached, {'prompt_tokens': 0, 'completion_tokens': 0, 'cached': True}
+        incr('llm.requests')
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        kwargs = {'model': self.model, 'messages': messages}
+        if response_format is not None:
+            kwargs['response_format'] = response_format
+
+        async with self._semaphore:
+            # Slots free up within the deadline, since every running call is bounded by it
+            budget = timeout if timeout is not None else self.timeout
+            if deadline is not None:
+                budget = min(budget, deadline - time.monotonic())
+            if budget <= 0:
+                raise asyncio.TimeoutError("LLM deadline already passed")
+            response = await asyncio.wait_for(self._get_client().chat.completions.create(**kwargs), budget)
+        content = response.choices[0].message.content
+        if validate is None or validate(content):
+            self.cache.set(key, content)
+        else:
+            incr('llm.rejected_replies')
+        usage = {
+            'prompt_tokens': getattr(response.usage, 'prompt_tokens', 0) or 0,
+            'completion_tokens': getattr(response.usage, 'completion_tokens', 0) or 0,
+            'cached': False
+        }
+        incr('llm.prompt_tokens', usage['prompt_tokens'])
+        incr('llm.completion_tokens', usage['completion_tokens'])
+        return content, usage
+
+    def submit(self, coro):
+        """Schedule a coroutine on the client's event loop and return a Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def complete_sync(self, messages, response_format=None, timeout=None):
+        """Blocking wrapper for Streamlit scripts; cache hits skip the event loop"""
+        cached = self.cache.get(prompt_key(self.model, messages, response_format))
+        if cached is not None:
+            incr('llm.cache_hits')
+            return cached
+        return self.submit(self.complete(messages, response_format, timeout)).result()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_llm_client():
+    """Process-wide LLM client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AsyncLLMClient()
+    return _client
+
+def set_llm_client(client):
+    """Replace the process-wide client, e.g. with one pointed at a mock server"""
+    global _client
+    with _client_lock:
+        _client = client
+    return _client
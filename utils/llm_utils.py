@@ -1,21 +1,29 @@
 import os
 import json
-from openai import OpenAI
-
-# Initialize OpenAI client
-client = OpenAI()
-
+from utils.llm_client import get_llm_client
+from utils.instrumentation import instrument
+
+MEDIUM_RISK_DELAY_HOURS = 3
+HIGH_RISK_DELAY_HOURS = 5
+HIGH_RISK_WEATHER = ['Storm', 'Snow']
+
+def rule_based_risk_level(shipment_data):
+    """Risk level from predicted delay and weather, without the API"""
+    risk_level = "Low"
+    if shipment_data['predicted_delay'] > MEDIUM_RISK_DELAY_HOURS:
+        risk_level = "Medium"
+    if shipment_data['predicted_delay'] > HIGH_RISK_DELAY_HOURS or shipment_data['weather_condition'] in HIGH_RISK_WEATHER:
+        risk_level = "High"
+    return risk_level
+
+@instrument()
 def analyze_shipment_status(shipment_data):
     """
     Use OpenAI to analyze shipment data and provide intelligent status updates
     """
     try:
         # Basic analysis without API
-        risk_level = "Low"
-        if shipment_data['predicted_delay'] > 3:
-            risk_level = "Medium"
-        if shipment_data['predicted_delay'] > 5 or shipment_data['weather_condition'] in ['Storm', 'Snow']:
-            risk_level = "High"
+        risk_level = rule_based_risk_level(shipment_data)
 
         # Try to get AI-powered analysis
         try:
@@ -35,16 +43,14 @@ def analyze_shipment_status(shipment_data):
             5. route_analysis: Brief analysis of the chosen route and potential alternatives
             """
 
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
+            # Cached, rate-limited gpt-4o call; see utils/llm_client.py
+            return get_llm_client().complete_sync(
+                [
                     {"role": "system", "content": "You are a logistics expert analyzing shipment data."},
                     {"role": "user", "content": prompt}
                 ],
                 response_format={"type": "json_object"}
             )
-            return response.choices[0].message.content
 
         except Exception as api_error:
             # Fallback to basic analysis if API fails
@@ -69,6 +75,7 @@ def analyze_shipment_status(shipment_data):
             "route_analysis": "Analysis unavailable"
         })
 
+@instrument()
 def generate_delay_insights(historical_data):
     """
     Generate insights about delay patterns, with fallback to basic analysis
@@ -76,7 +83,7 @@ def generate_delay_insights(historical_data):
     try:
         # Basic statistical analysis
         avg_delay = historical_data['predicted_delay'].mean()
-        weather_impact = historical_data.groupby('weather_condition')['predicted_delay'].mean()
+        weather_impact = historical_data.groupby('weather_condition', observed=True)['predicted_delay'].mean()
         worst_weather = weather_impact.idxmax()
 
         # Try AI-powered analysis
@@ -85,18 +92,14 @@ def generate_delay_insights(historical_data):
             Total Shipments: {len(historical_data)}
             Average Delay: {avg_delay:.1f} hours
             Weather Conditions: {', '.join(historical_data['weather_condition'].unique())}
-            Most Common Routes: {', '.join(historical_data.groupby(['origin', 'destination']).size().nlargest(3).index.map(lambda x: f'{x[0]} to {x[1]}'))}
+            Most Common Routes: {', '.join(historical_data.groupby(['origin', 'destination'], observed=True).size().nlargest(3).index.map(lambda x: f'{x[0]} to {x[1]}'))}
             """
 
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a logistics analyst providing insights on shipping patterns."},
-                    {"role": "user", "content": f"Analyze this shipping data and provide key insights:\n{data_summary}"}
-                ]
-            )
-            return response.choices[0].message.content
+            # Cached, rate-limited gpt-4o call; see utils/llm_client.py
+            return get_llm_client().complete_sync([
+                {"role": "system", "content": "You are a logistics analyst providing insights on shipping patterns."},
+                {"role": "user", "content": f"Analyze this shipping data and provide key insights:\n{data_summary}"}
+            ])
 
         except Exception as api_error:
             # Fallback to basic insights
@@ -114,6 +117,7 @@ def generate_delay_insights(historical_data):
     except Exception as e:
         return "Unable to generate delay insights at this time."
 
+@instrument()
 def suggest_route_improvements(origin, destination, current_delay):
     """
     Suggest route improvements with fallback to basic suggestions
@@ -142,15 +146,11 @@ def suggest_route_improvements(origin, destination, current_delay):
             4. Risk mitigation strategies
             """
 
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a route optimization expert."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content
+            # Cached, rate-limited gpt-4o call; see utils/llm_client.py
+            return get_llm_client().complete_sync([
+                {"role": "system", "content": "You are a route optimization expert."},
+                {"role": "user", "content": prompt}
+            ])
 
         except Exception as api_error:
             return basic_recommendations
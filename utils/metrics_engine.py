@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+DELAY_THRESHOLD_HOURS = 2  # Shipments with predicted_delay above this count as delayed
+
+class KpiAggregator:
+    """
+    Running sums and counts behind the dashboard KPIs. Built once from a
+    table, then updated per inserted batch or changed shipment, so reading
+    the KPIs never rescans the table.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.active = 0
+        self.delayed = 0
+        self.delay_sum = 0.0
+        self.delay_count = 0
+
+    @classmethod
+    def from_frame(cls, shipment_data):
+        aggregator = cls()
+        aggregator.add(shipment_data)
+        return aggregator
+
+    def copy(self):
+        other = KpiAggregator()
+        other.__dict__.update(self.__dict__)
+        return other
+
+    def merge(self, other):
+        """Combined KPIs of two disjoint sets of shipments"""
+        merged = self.copy()
+        merged.total += other.total
+        merged.active += other.active
+        merged.delayed += other.delayed
+        merged.delay_sum += other.delay_sum
+        merged.delay_count += other.delay_count
+        return merged
+
+    def add(self, rows, sign=1):
+        """Count a batch of shipments in (sign=1) or out (sign=-1)"""
+        delays = rows['predicted_delay'].to_numpy(dtype=np.float64)
+        known = ~np.isnan(delays)
+        self.total += sign * len(rows)
+        self.active += sign * int((rows['status'] != 'Delivered').sum())
+        self.delayed += sign * int((delays[known] > DELAY_THRESHOLD_HOURS).sum())
+        self.delay_sum += sign * float(delays[known].sum())
+        self.delay_count += sign * int(known.sum())
+
+    def update_status(self, old_status, new_status):
+        self.active += (new_status != 'Delivered') - (old_status != 'Delivered')
+
+    def update_delay(self, old_delay, new_delay):
+        for delay, sign in ((old_delay, -1), (new_delay, 1)):
+            if delay is None or np.isnan(delay):
+                continue
+            self.delayed += sign * (delay > DELAY_THRESHOLD_HOURS)
+            self.delay_sum += sign * delay
+            self.delay_count += sign
+
+    def snapshot(self):
+        """KPI values for display"""
+        # Shipments without a predicted delay are neither on time nor delayed
+        known = self.delay_count
+        on_time_rate = (known - self.delayed) / known * 100 if known else 0.0
+        return {
+            'total_shipments': self.total,
+            'active_shipments': self.active,
+            'delayed_shipments': self.delayed,
+            'on_time_rate': on_time_rate,
+            'avg_delay': self.delay_sum / self.delay_count if self.delay_count else float('nan')
+        }
+
+CUBE_DIMENSIONS = ['origin', 'destination', 'weather_condition', 'day']
+CUBE_MEASURES = ['count', 'delay_count', 'delay_sum', 'delay_sumsq']
+
+class ShipmentCube:
+    """
+    Pre-aggregated shipment counts and predicted_delay sums and sums of
+    squares per (origin, destination, weather_condition, day). Charts and
+    tables roll the cube up to the dimensions they need instead of
+    regrouping raw shipments; new batches are folded in as they arrive.
+    """
+
+    def __init__(self, cells=None):
+        if cells is None:
+            index = pd.MultiIndex.from_arrays([[]] * len(CUBE_DIMENSIONS), names=CUBE_DIMENSIONS)
+            cells = pd.DataFrame({measure: [] for measure in CUBE_MEASURES}, index=index)
+        self.cells = cells
+
+    @classmethod
+    def from_frame(cls, shipment_data):
+        cube = cls()
+        cube.add(shipment_data)
+        return cube
+
+    def __len__(self):
+        return len(self.cells)
+
+    def memory_usage(self):
+        """Bytes held by the cells, index included"""
+        return int(self.cells.memory_usage(deep=True).sum())
+
+    @staticmethod
+    def _aggregate(rows, sign=1):
+        delays = rows['predicted_delay'].to_numpy(dtype=np.float64)
+        known = ~np.isnan(delays)
+        delays = np.where(known, delays, 0.0)
+        keys = {
+            'origin': rows['origin'],
+            'destination': rows['destination'],
+            'weather_condition': rows['weather_condition'],
+            'day': pd.to_datetime(rows['departure_time']).dt.floor('D')
+        }
+        measures = pd.DataFrame({
+            'count': np.full(len(rows), sign, dtype=np.int64),
+            'delay_count': sign * known.astype(np.int64),
+            'delay_sum': sign * delays,
+            'delay_sumsq': sign * delays * delays
+        }, index=rows.index)
+        cells = measures.groupby(
+            [keys[dimension].rename(dimension) for dimension in CUBE_DIMENSIONS],
+            observed=True, dropna=False
+        ).sum()
+        # Plain labels, so cubes built from frames with different categories combine
+        return cells.set_axis(cells.index.set_levels(
+            [level.astype(object) if isinstance(level, pd.CategoricalIndex) else level
+             for level in cells.index.levels]
+        ), axis=0)
+
+    def _combine(self, cells):
+        if not len(self.cells):
+            return cells
+        combined = pd.concat([self.cells, cells]).groupby(level=CUBE_DIMENSIONS, dropna=False).sum()
+        # A delta cell can net zero shipments but not zero delay (an edited delay)
+        return combined[(combined[CUBE_MEASURES] != 0).any(axis=1)]
+
+    def add(self, rows, sign=1):
+        """Fold a batch of shipments in (sign=1) or out (sign=-1)"""
+        if len(rows):
+            self.cells = self._combine(self._aggregate(rows, sign))
+
+    def merge(self, other):
+        """Cube over the shipments of both cubes"""
+        if not len(other):
+            return self
+        return ShipmentCube(self._combine(other.cells))
+
+    def rollup(self, dimensions):
+        """Aggregate to the given dimensions
+
+        Returns a DataFrame indexed by dimensions with count (shipments) and
+        the mean and sample standard deviation of predicted_delay.
+        """
+        totals = self.cells.groupby(level=dimensions, dropna=True).sum()
+        totals = totals[totals['count'] > 0]
+        n = totals['delay_count']
+        mean = totals['delay_sum'] / n.where(n > 0)
+        variance = (totals['delay_sumsq'] - n * mean ** 2) / (n - 1).where(n > 1)
+        return pd.DataFrame({
+            'mean': mean,
+            'std': np.sqrt(variance.clip(lower=0)),
+            'count': totals['count']
+        })
@@ -1,103 +1,281 @@
+import threading
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
+import pandas as pd
+from utils.geo_utils import get_city_registry
+from utils.lazy_imports import lazy_import
+from utils.instrumentation import instrument
+
+sklearn_ensemble = lazy_import('sklearn.ensemble')
+
+HOUR_NS = 3_600_000_000_000
+DAY_NS = 24 * HOUR_NS
+EPOCH_DAYOFWEEK = 3  # 1970-01-01 was a Thursday
+
+class FeaturePipeline:
+    """Compiled feature builder with fixed category codes and reusable buffers
+
+    fit() learns the scaling statistics and the fallback category once;
+    transform() only applies them, writing float32 features into a
+    per-thread buffer that is reused across calls.
+    """
+    WEATHER_CATEGORIES = ['Clear', 'Rain', 'Snow', 'Storm']
+    N_FEATURES = 4
+
+    def __init__(self, weather_categories=None):
+        self.weather_categories = list(weather_categories or self.WEATHER_CATEGORIES)
+        self.unknown_weather_code = 0
+        self.mean_ = None
+        self.scale_ = None
+        self.is_fitted = False
+        self._buffers = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_buffers']
+        return state
+
+    def __setstate__(self, state):
+        state.pop('last_unknown_count', None)  # Instance attribute in older saved models
+        self.__dict__.update(state)
+        self._buffers = threading.local()
+
+    @property
+    def last_unknown_count(self):
+        """Unknown weather values in this thread's last transform"""
+        return getattr(self._buffers, 'unknown_count', 0)
+
+    def schema(self):
+        """Describe the encoded features and category codes"""
+        return {
+            'weather_categories': self.weather_categories,
+            'n_features': self.N_FEATURES
+        }
+
+    def _get_buffers(self, n_rows):
+        """Return this thread's feature and scratch buffers, grown to n_rows"""
+        features = getattr(self._buffers, 'features', None)
+        if features is None or features.shape[0] < n_rows:
+            capacity = max(n_rows, 1024)
+            self._buffers.features = np.empty((capacity, self.N_FEATURES), dtype=np.float32)
+            self._buffers.scratch = np.empty(capacity, dtype=np.int64)
+        return self._buffers.features[:n_rows], self._buffers.scratch[:n_rows]
+
+    def _weather_codes(self, weather):
+        """Encode weather with the fixed categories; unknown values get -1"""
+        if isinstance(weather.dtype, pd.CategoricalDtype):
+            if list(weather.cat.categories) != self.weather_categories:
+                weather = weather.cat.set_categories(self.weather_categories)
+            return weather.cat.codes.to_numpy()
+        return pd.Categorical(weather, categories=self.weather_categories).codes
+
+    def _timestamps(self, departure_time):
+        """Departure times as int64 nanoseconds since the epoch"""
+        if not pd.api.types.is_datetime64_any_dtype(departure_time):
+            departure_time = pd.to_datetime(departure_time)
+        if getattr(departure_time.dtype, 'tz', None) is not None:
+            departure_time = departure_time.dt.tz_localize(None)
+        return departure_time.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+    def _distances(self, data):
+        """distance_km, filled from the city distance matrix where missing"""
+        if 'distance_km' in data:
+            distances = data['distance_km'].to_numpy(dtype=np.float64)
+            missing = np.isnan(distances)
+            if not missing.any():
+                return distances
+            distances = distances.copy()
+        else:
+            distances = np.empty(len(data), dtype=np.float64)
+            missing = slice(None)
+
+        registry = get_city_registry()
+        distances[missing] = registry.pairwise_distances(
+            data['origin'][missing], data['destination'][missing]
+        )
+        return distances
+
+    def _encode(self, data):
+        """Write unscaled features into the reusable buffer"""
+        features, scratch = self._get_buffers(len(data))
+
+        features[:, 0] = self._distances(data)
+
+        codes = self._weather_codes(data['weather_condition'])
+        unknown = codes < 0
+        # Per thread, like the buffers: the pipeline is shared by every session
+        self._buffers.unknown_count = int(unknown.sum())
+        features[:, 1] = codes
+        if self._buffers.unknown_count:
+            features[unknown, 1] = self.unknown_weather_code
+
+        timestamps = self._timestamps(data['departure_time'])
+        np.floor_divide(timestamps, HOUR_NS, out=scratch)
+        np.remainder(scratch, 24, out=scratch)
+        features[:, 2] = scratch
+        np.floor_divide(timestamps, DAY_NS, out=scratch)
+        np.add(scratch, EPOCH_DAYOFWEEK, out=scratch)
+        np.remainder(scratch, 7, out=scratch)
+        features[:, 3] = scratch
+        return features
+
+    def fit(self, data):
+        """Learn scaling statistics and the fallback for unknown weather"""
+        codes = self._weather_codes(data['weather_condition'])
+        known = codes[codes >= 0]
+        if len(known):
+            # Unknown weather falls back to the most common training condition
+            self.unknown_weather_code = int(np.bincount(known).argmax())
+
+        features = self._encode(data)
+        self.mean_ = features.mean(axis=0, dtype=np.float64).astype(np.float32)
+        scale = features.std(axis=0, dtype=np.float64).astype(np.float32)
+        scale[scale == 0] = 1.0
+        self.scale_ = scale
+        self.is_fitted = True
+        return self
+
+    def transform(self, data):
+        """Build scaled features; the result is a view reused by the next call"""
+        if not self.is_fitted:
+            raise ValueError("FeaturePipeline must be fitted before transform")
+        features = self._encode(data)
+        np.subtract(features, self.mean_, out=features)
+        np.divide(features, self.scale_, out=features)
+        return features
+
+    def fit_transform(self, data):
+        """Fit on the training data and return its scaled features"""
+        return self.fit(data).transform(data)
 
 class DelayPredictor:
+    FEATURES = ['distance_km', 'weather_condition', 'departure_hour', 'departure_dayofweek']
+    SCHEMA_VERSION = 2
+
     def __init__(self):
-        self.model = RandomForestRegressor(
+        self.model = sklearn_ensemble.RandomForestRegressor(
             n_estimators=100,
             random_state=42
         )
-        self.scaler = StandardScaler()
+        self.pipeline = FeaturePipeline()
+        self.schema_version = self.SCHEMA_VERSION
         self.is_fitted = False
 
+    def feature_schema(self):
+        """Describe the model inputs so saved models can be matched to their features"""
+        return {
+            'version': self.SCHEMA_VERSION,
+            'features': self.FEATURES,
+            'pipeline': self.pipeline.schema(),
+            'model': type(self.model).__name__,
+            'params': self.model.get_params()
+        }
+
     def prepare_features(self, data):
-        """Convert raw shipment data into ML features"""
-        # Example feature engineering
-        features = np.column_stack([
-            data['distance_km'],
-            data['weather_condition'].map({
-                'Clear': 0, 'Rain': 1, 'Snow': 2, 'Storm': 3
-            }),
-            data['departure_time'].dt.hour,
-            data['departure_time'].dt.dayofweek
-        ])
-        return self.scaler.fit_transform(features) if not self.is_fitted else self.scaler.transform(features)
+        """Convert raw shipment data into scaled float32 ML features"""
+        return self.pipeline.transform(data)
 
+    @instrument()
     def fit(self, shipment_data):
         """Train the model with historical data"""
-        features = self.prepare_features(shipment_data)
+        features = self.pipeline.fit_transform(shipment_data)
         # Use predicted_delay as target variable
         self.model.fit(features, shipment_data['predicted_delay'])
         self.is_fitted = True
 
+    @instrument()
     def predict_delay(self, shipment_data):
         """Predict shipping delays based on current conditions"""
         if not self.is_fitted:
-            # Train with mock data if not fitted
-            from data.mock_shipments import generate_mock_data
-            training_data = generate_mock_data(1000)  # Generate more data for training
-            self.fit(training_data)
+            # Reuse the registry's trained model instead of retraining per call
+            from utils.model_registry import get_predictor
+            trained = get_predictor()
+            self.model = trained.model
+            self.pipeline = trained.pipeline
+            self.is_fitted = True
 
         features = self.prepare_features(shipment_data)
         return self.model.predict(features)
 
-def optimize_route(origin, destination, waypoints):
+@instrument()
+def score_shipments(shipment_data, predictor=None, chunk_size=50000, n_jobs=-1):
+    """Score every shipment in one pass and write predicted_delay back in place
+
+    Features for the whole table are built at once; the forest then scores
+    fixed-size chunks in parallel threads so memory stays bounded.
+
+    Parameters:
+    - shipment_data: DataFrame with distance_km, weather_condition and departure_time
+    - predictor: Fitted DelayPredictor, defaults to the registry's active model
+    - chunk_size: Rows scored per task
+    - n_jobs: Parallel workers, -1 for all cores
+
+    Returns:
+    - shipment_data: The same DataFrame with predicted_delay updated
+    """
+    from joblib import Parallel, delayed
+
+    if predictor is None:
+        from utils.model_registry import get_predictor
+        predictor = get_predictor()
+
+    if len(shipment_data) == 0:
+        shipment_data['predicted_delay'] = np.empty(0, dtype=np.float64)
+        return shipment_data
+
+    features = predictor.prepare_features(shipment_data)
+    chunks = [
+        features[start:start + chunk_size]
+        for start in range(0, len(features), chunk_size)
+    ]
+    predictions = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(predictor.model.predict)(chunk) for chunk in chunks
+    )
+
+    shipment_data['predicted_delay'] = np.concatenate(predictions)
+    return shipment_data
+
+@instrument()
+def optimize_route(origin, destination, waypoints, solver='greedy', time_budget=1.0):
     """Route optimization using distance-based approach
 
     This function optimizes delivery routes between two points:
-    1. Calculates distances between all points
-    2. Uses a simple nearest neighbor algorithm to find the best route
-    3. Returns the optimized sequence of waypoints
+    1. Looks up distances between all points in the city distance matrix
+    2. Uses a nearest neighbor algorithm to find an initial route
+    3. With solver='local_search', improves it with 2-opt and Or-opt moves
+       until no move helps or time_budget seconds have passed
+    4. Returns the optimized sequence of waypoints
 
     Parameters:
     - origin: Starting city
     - destination: Final destination
     - waypoints: List of cities to visit
+    - solver: 'greedy' or 'local_search'
+    - time_budget: Seconds allowed for local search improvement
 
     Returns:
     - optimized_route: List of waypoints in optimal order
     - estimated_time: Estimated delivery time in hours
     """
-    # Simple route optimization logic
-    points = [origin] + waypoints
-    optimized_route = []
-    current_point = origin
-    unvisited = waypoints.copy()
-
-    while unvisited:
-        # Find nearest unvisited point
-        distances = [calculate_distance(current_point, p) for p in unvisited]
-        nearest_idx = np.argmin(distances)
-        next_point = unvisited.pop(nearest_idx)
-        optimized_route.append(next_point)
-        current_point = next_point
-
-    total_distance = sum([
-        calculate_distance(origin, optimized_route[0])
-    ] + [
-        calculate_distance(optimized_route[i], optimized_route[i+1])
-        for i in range(len(optimized_route)-1)
-    ] + [
-        calculate_distance(optimized_route[-1], destination)
-    ])
+    from utils.route_solver import greedy_path, path_length, solve_path
+
+    registry = get_city_registry()
+    points = [origin] + list(waypoints) + [destination]
+    distances = registry.submatrix(registry.city_ids(points)).astype(np.float64)
+
+    if solver == 'local_search':
+        path, total_distance = solve_path(distances, time_budget=time_budget)
+    elif solver == 'greedy':
+        path = greedy_path(distances)
+        total_distance = path_length(path, distances)
+    else:
+        raise ValueError(f"Unknown solver: {solver}")
 
     # Estimate time based on average speed of 60 km/h
     estimated_time = total_distance / 60
 
+    optimized_route = [points[i] for i in path[1:-1]]
     return optimized_route, estimated_time
 
 def calculate_distance(city1, city2):
-    """Calculate approximate distance between two cities"""
-    from utils.viz_utils import get_city_coords
-
-    coord1 = get_city_coords(city1)
-    coord2 = get_city_coords(city2)
-
-    # Simple Euclidean distance * scaling factor for demonstration
-    dist = np.sqrt(
-        (coord1[0] - coord2[0])**2 + 
-        (coord1[1] - coord2[1])**2
-    ) * 111  # Convert to approximate kilometers
-
-    return dist
\ No newline at end of file
+    """Calculate great-circle distance between two cities in km"""
+    return get_city_registry().distance(city1, city2)
@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+import threading
+import joblib
+import pandas as pd
+from utils.instrumentation import instrument
+
+MODEL_DIR = os.environ.get(
+    'SMARTLOGISTICS_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models')
+)
+ACTIVE_POINTER = 'active.json'
+TRAINING_SAMPLES = 1000
+
+# Process-wide cache of loaded predictors, shared by every Streamlit session
+_models = {}
+_active = {'key': None, 'mtime': None}
+_lock = threading.Lock()
+_train_lock = threading.Lock()
+
+def training_fingerprint(training_data, feature_schema):
+    """Content hash of the training data and the feature schema"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(feature_schema, sort_keys=True).encode())
+    digest.update(pd.util.hash_pandas_object(training_data, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def model_path(key):
+    """Location of a saved model on disk"""
+    return os.path.join(MODEL_DIR, f'delay_predictor_{key}.joblib')
+
+def save_model(predictor, key):
+    """Persist a fitted predictor under its fingerprint"""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = model_path(key)
+    tmp_path = f'{path}.tmp'
+    # Uncompressed so the forest's arrays can be memory-mapped on load
+    joblib.dump(predictor, tmp_path)
+    os.replace(tmp_path, path)
+    with _lock:
+        _models[key] = predictor
+    return path
+
+@instrument()
+def load_model(key):
+    """Load a saved predictor, reusing the in-process copy when available"""
+    with _lock:
+        if key in _models:
+            return _models[key]
+        predictor = joblib.load(model_path(key), mmap_mode='r')
+        _models[key] = predictor
+        return predictor
+
+def set_active_model(key):
+    """Point the registry at a saved model; running processes pick it up on next use"""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    pointer = os.path.join(MODEL_DIR, ACTIVE_POINTER)
+    tmp_pointer = f'{pointer}.tmp'
+    with open(tmp_pointer, 'w') as f:
+        json.dump({'key': key}, f)
+    os.replace(tmp_pointer, pointer)
+
+def get_active_key():
+    """Return the active model key, re-reading the pointer only when it changes"""
+    pointer = os.path.join(MODEL_DIR, ACTIVE_POINTER)
+    try:
+        mtime = os.path.getmtime(pointer)
+    except OSError:
+        return None
+
+    with _lock:
+        if _active['mtime'] == mtime:
+            return _active['key']
+
+    try:
+        with open(pointer) as f:
+            key = json.load(f).get('key')
+    except (OSError, ValueError):
+        return None
+
+    with _lock:
+        _active.update(key=key, mtime=mtime)
+    return key
+
+@instrument()
+def train_and_register(training_data):
+    """Fit a predictor, save it and make it the active model"""
+    from utils.ml_utils import DelayPredictor
+
+    predictor = DelayPredictor()
+    key = training_fingerprint(training_data, predictor.feature_schema())
+    if not os.path.exists(model_path(key)):
+        predictor.fit(training_data)
+        save_model(predictor, key)
+    set_active_model(key)
+    return load_model(key)
+
+def _load_active():
+    """Load the active model if it exists and matches the current feature schema"""
+    from utils.ml_utils import DelayPredictor
+
+    key = get_active_key()
+    if not key or not os.path.exists(model_path(key)):
+        return None
+    predictor = load_model(key)
+    if getattr(predictor, 'schema_version', None) != DelayPredictor.SCHEMA_VERSION:
+        return None
+    return predictor
+
+def get_predictor():
+    """Return the active fitted predictor, training one on first use"""
+    predictor = _load_active()
+    if predictor is not None:
+        return predictor
+
+    # Only one session trains; the others wait and reuse its model
+    with _train_lock:
+        predictor = _load_active()
+        if predictor is not None:
+            return predictor
+
+        from data.mock_shipments import generate_mock_data
+        return train_and_register(generate_mock_data(TRAINING_SAMPLES))
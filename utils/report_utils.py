@@ -0,0 +1,257 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from utils.instrumentation import instrument
+
+PAGE_WIDTH = 612  # US Letter, in points
+PAGE_HEIGHT = 792
+MARGIN = 50
+REPORT_DETAIL_ROWS = 10000  # Detail rows rendered before the section is truncated
+REPORT_CHUNK_ROWS = 5000
+DETAIL_COLUMNS = ['shipment_id', 'origin', 'destination', 'status', 'departure_time', 'predicted_delay']
+REPORT_DIR = os.path.join(tempfile.gettempdir(), 'smartlogistics_reports')
+REPORT_TTL_SECONDS = 3600
+
+def _escape(text):
+    """Escape a string for a PDF literal, dropping characters outside Latin-1"""
+    text = str(text).encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _fit(text, width, size):
+    """Truncate text to roughly fit width points of Helvetica at size"""
+    text = str(text)
+    max_chars = max(int(width / (size * 0.5)), 1)
+    return text if len(text) <= max_chars else text[:max_chars - 1] + '~'
+
+class PdfReportWriter:
+    """
+    Minimal streaming PDF writer for text reports. Each page is written to
+    disk as soon as it is full, so memory holds one page regardless of
+    report length.
+    """
+
+    def __init__(self, path, title):
+        self.path = path
+        self.title = title
+        self._file = open(path, 'wb')
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = 5  # 1 catalog, 2 page tree, 3-4 fonts
+        self._ops = []
+        self._y = None
+
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._write_object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        self._write_object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    def _write(self, data):
+        self._file.write(data)
+
+    def _write_object(self, object_id, body):
+        self._offsets[object_id] = self._file.tell()
+        self._write(f'{object_id} 0 obj\n'.encode() + body + b'\nendobj\n')
+
+    def _allocate(self):
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _flush_page(self):
+        if self._y is None:
+            return
+        page_number = len(self._page_ids) + 1
+        self._ops.append(
+            f'BT /F1 8 Tf {MARGIN} {MARGIN / 2} Td ({_escape(self.title)} - page {page_number}) Tj ET'
+        )
+        content = '\n'.join(self._ops).encode('latin-1')
+        content_id, page_id = self._allocate(), self._allocate()
+        self._write_object(
+            content_id,
+            f'<< /Length {len(content)} >>\nstream\n'.encode() + content + b'\nendstream'
+        )
+        self._write_object(
+            page_id,
+            (f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+             f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>').encode()
+        )
+        self._page_ids.append(page_id)
+        self._ops = []
+        self._y = None
+
+    def new_page(self):
+        self._flush_page()
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def _reserve(self, height):
+        """Start a new page unless height points fit on the current one"""
+        if self._y is None or self._y - height < MARGIN:
+            self.new_page()
+
+    def text(self, text, size=10, bold=False, x=MARGIN):
+        self._reserve(size + 4)
+        self._y -= size + 4
+        font = 'F2' if bold else 'F1'
+        self._ops.append(f'BT /{font} {size} Tf {x} {self._y} Td ({_escape(text)}) Tj ET')
+
+    def heading(self, text, size=14):
+        self._reserve(size * 3)
+        self._y -= size / 2
+        self.text(text, size=size, bold=True)
+
+    def spacer(self, height=8):
+        if self._y is not None:
+            self._y -= height
+
+    def table(self, columns, rows, widths=None, size=8):
+        """Render rows (an iterable of sequences) with the header repeated on each page"""
+        usable = PAGE_WIDTH - 2 * MARGIN
+        widths = widths or [usable / len(columns)] * len(columns)
+
+        def row_ops(values, font):
+            x = MARGIN
+            for value, width in zip(values, widths):
+                self._ops.append(
+                    f'BT /{font} {size} Tf {x:.1f} {self._y} Td ({_escape(_fit(value, width, size))}) Tj ET'
+                )
+                x += width
+
+        def header():
+            self._y -= size + 4
+            row_ops(columns, 'F2')
+
+        self._reserve(2 * (size + 4))
+        header()
+        for values in rows:
+            if self._y - (size + 4) < MARGIN:
+                self.new_page()
+                header()
+            self._y -= size + 4
+            row_ops(values, 'F1')
+
+    def close(self):
+        self._flush_page()
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>'.encode())
+
+        xref_offset = self._file.tell()
+        self._write(f'xref\n0 {self._next_id}\n0000000000 65535 f \n'.encode())
+        for object_id in range(1, self._next_id):
+            self._write(f'{self._offsets[object_id]:010d} 00000 n \n'.encode())
+        self._write(
+            f'trailer\n<< /Size {self._next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode()
+        )
+        self._file.close()
+
+def _format_cell(value):
+    if pd.isna(value):  # None, NaN and NaT, e.g. a missing departure_time from an upload
+        return ''
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d %H:%M')
+    return str(value)
+
+def _detail_rows(df, max_rows, chunk_size=REPORT_CHUNK_ROWS):
+    """Yield formatted detail rows chunk by chunk"""
+    columns = [column for column in DETAIL_COLUMNS if column in df.columns]
+    for start in range(0, min(len(df), max_rows), chunk_size):
+        chunk = df.iloc[start:min(start + chunk_size, max_rows)][columns]
+        for values in chunk.itertuples(index=False, name=None):
+            yield [_format_cell(value) for value in values]
+
+def write_pdf_report(df, path, report_type="shipments", max_detail_rows=REPORT_DETAIL_ROWS):
+    """Write a PDF report: KPIs, aggregated tables and paginated shipment details"""
+    from utils.data_utils import calculate_performance_metrics, get_weather_impact
+
+    title = f"{report_type.title()} Report"
+    writer = PdfReportWriter(path, title)
+    try:
+        writer.heading(title, size=18)
+        writer.text(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        writer.spacer()
+
+        if len(df):
+            metrics = calculate_performance_metrics(df)
+            writer.heading("Key Performance Indicators")
+            writer.table(
+                ['Metric', 'Value'],
+                [
+                    ['Total Shipments', f"{metrics['total_shipments']:,}"],
+                    ['Delayed Shipments', f"{metrics['delayed_shipments']:,}"],
+                    ['On-Time Rate', f"{metrics['on_time_rate']:.1f}%"],
+                    ['Average Delay', f"{metrics['avg_delay']:.1f} hours"]
+                ],
+                widths=[200, 200],
+                size=10
+            )
+            writer.spacer()
+
+            weather_impact = get_weather_impact(df).reset_index()
+            writer.heading("Delays by Weather Condition")
+            writer.table(
+                ['Weather', 'Average Delay (h)', 'Shipments'],
+                ([row.weather_condition, f'{row.mean:.2f}', f'{row.count:,}']
+                 for row in weather_impact.itertuples()),
+                widths=[160, 160, 160]
+            )
+            writer.spacer()
+
+            routes = df.groupby(['origin', 'destination'], observed=True)['predicted_delay'].agg(
+                ['mean', 'count']
+            ).sort_values('count', ascending=False).head(20).reset_index()
+            writer.heading("Top Routes")
+            writer.table(
+                ['Origin', 'Destination', 'Average Delay (h)', 'Shipments'],
+                ([row.origin, row.destination, f'{row.mean:.2f}', f'{row.count:,}']
+                 for row in routes.itertuples()),
+                widths=[140, 140, 120, 100]
+            )
+
+        writer.new_page()
+        writer.heading("Shipment Details")
+        if len(df) > max_detail_rows:
+            writer.text(f"Showing the first {max_detail_rows:,} of {len(df):,} shipments")
+        writer.table(
+            [column for column in DETAIL_COLUMNS if column in df.columns],
+            _detail_rows(df, max_detail_rows),
+            widths=[70, 85, 85, 65, 115, 72]
+        )
+    finally:
+        writer.close()
+    return path
+
+def _cleanup_reports(now=None):
+    """Remove report files older than REPORT_TTL_SECONDS"""
+    now = now or time.time()
+    for name in os.listdir(REPORT_DIR):
+        path = os.path.join(REPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > REPORT_TTL_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+
+@instrument()
+def generate_pdf_report(df, report_type="shipments", max_detail_rows=REPORT_DETAIL_ROWS):
+    """Generate a PDF report of the data; returns the path of the PDF file"""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    _cleanup_reports()
+    fd, path = tempfile.mkstemp(prefix=f'{report_type}_', suffix='.pdf', dir=REPORT_DIR)
+    os.close(fd)
+    return write_pdf_report(df, path, report_type, max_detail_rows)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def submit_pdf_report(df, report_type="shipments", max_detail_rows=REPORT_DETAIL_ROWS):
+    """Render a PDF report in a background worker; returns a Future of its path"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='pdf-report')
+    return _executor.submit(generate_pdf_report, df, report_type, max_detail_rows)
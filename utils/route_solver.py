@@ -0,0 +1,103 @@
+import time
+import numpy as np
+
+IMPROVEMENT_EPS = 1e-9
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+
+def path_length(path, distances):
+    """Total length of a path given as node indices"""
+    path = np.asarray(path)
+    return float(distances[path[:-1], path[1:]].sum())
+
+def greedy_path(distances):
+    """Nearest neighbour path from node 0 to the last node through all others"""
+    n = len(distances)
+    path = [0]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[[0, n - 1]] = False
+    current = 0
+    for _ in range(n - 2):
+        candidates = np.where(unvisited, distances[current], np.inf)
+        current = int(np.argmin(candidates))
+        unvisited[current] = False
+        path.append(current)
+    if n > 1:
+        path.append(n - 1)
+    return np.array(path, dtype=np.int64)
+
+def two_opt_pass(path, distances, deadline):
+    """One sweep of best-improvement 2-opt with fixed endpoints; returns True if improved"""
+    n = len(path)
+    improved = False
+    for i in range(1, n - 2):
+        if time.perf_counter() > deadline:
+            break
+        a, b = path[i - 1], path[i]
+        js = np.arange(i + 1, n - 1)
+        c, d = path[js], path[js + 1]
+        # Reversing path[i..j] swaps edges (a,b),(c,d) for (a,c),(b,d)
+        delta = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+        best = int(np.argmin(delta))
+        if delta[best] < -IMPROVEMENT_EPS:
+            j = js[best]
+            path[i:j + 1] = path[i:j + 1][::-1]
+            improved = True
+    return improved
+
+def or_opt_pass(path, distances, deadline):
+    """One sweep of Or-opt segment moves (lengths 1-3); returns True if improved"""
+    improved = False
+    for k in OR_OPT_SEGMENT_LENGTHS:
+        i = 1
+        while i + k < len(path):
+            if time.perf_counter() > deadline:
+                return improved
+            p, q = path[i - 1], path[i + k]
+            first, last = path[i], path[i + k - 1]
+            removal_gain = distances[p, first] + distances[last, q] - distances[p, q]
+
+            # Candidate insertion edges (path[j], path[j+1]) outside the segment
+            remaining = np.concatenate([path[:i], path[i + k:]])
+            left, right = remaining[:-1], remaining[1:]
+            forward = distances[left, first] + distances[last, right] - distances[left, right]
+            backward = distances[left, last] + distances[first, right] - distances[left, right]
+            insertion = np.minimum(forward, backward)
+            insertion[i - 1] = np.inf  # Reinserting where it came from
+
+            j = int(np.argmin(insertion))
+            if insertion[j] - removal_gain < -IMPROVEMENT_EPS:
+                segment = path[i:i + k]
+                if backward[j] < forward[j]:
+                    segment = segment[::-1]
+                path[:] = np.concatenate([remaining[:j + 1], segment, remaining[j + 1:]])
+                improved = True
+            else:
+                i += 1
+    return improved
+
+def solve_path(distances, time_budget=1.0):
+    """Shortest open path from node 0 to the last node visiting every node
+
+    Starts from the nearest neighbour path and alternates 2-opt and Or-opt
+    sweeps until neither improves the path or the time budget runs out.
+
+    Parameters:
+    - distances: Square distance matrix
+    - time_budget: Wall-clock seconds allowed for improvement
+
+    Returns:
+    - path: Node indices, starting at 0 and ending at the last node
+    - length: Total path length
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    deadline = time.perf_counter() + time_budget
+    path = greedy_path(distances)
+
+    if len(path) > 3:
+        while time.perf_counter() < deadline:
+            improved = two_opt_pass(path, distances, deadline)
+            improved = or_opt_pass(path, distances, deadline) or improved
+            if not improved:
+                break
+
+    return path, path_length(path, distances)
@@ -0,0 +1,60 @@
+import re
+import sys
+import subprocess
+
+# Modules imported when each Streamlit entry point starts
+ENTRY_POINT_MODULES = [
+    'streamlit',
+    'pandas',
+    'data.mock_shipments',
+    'utils.ml_utils',
+    'utils.viz_utils',
+    'utils.weather_utils',
+    'utils.llm_utils',
+    'utils.export_utils',
+    'utils.data_utils'
+]
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def profile_imports(modules=None, cwd=None):
+    """Measure cold import cost with `python -X importtime` in a fresh interpreter
+
+    Returns a list of dicts with module, self_ms, cumulative_ms and depth,
+    sorted by cumulative time, covering every module the imports pulled in.
+    """
+    modules = modules or ENTRY_POINT_MODULES
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', '; '.join(f'import {m}' for m in modules)],
+        capture_output=True, text=True, cwd=cwd
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    timings = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append({
+                'module': module,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2
+            })
+    return sorted(timings, key=lambda t: t['cumulative_ms'], reverse=True)
+
+def top_level_costs(modules=None, cwd=None):
+    """Cumulative import cost of each requested module on its own cold start"""
+    modules = modules or ENTRY_POINT_MODULES
+    costs = {}
+    for module in modules:
+        timings = profile_imports([module], cwd=cwd)
+        costs[module] = next(
+            (t['cumulative_ms'] for t in timings if t['module'] == module), 0.0
+        )
+    return costs
+
+if __name__ == "__main__":
+    for module, cost in sorted(top_level_costs().items(), key=lambda item: -item[1]):
+        print(f"{cost:10.1f} ms  {module}")
@@ -0,0 +1,170 @@
+import json
+import time
+import asyncio
+from functools import partial
+import numpy as np
+from utils.llm_client import get_llm_client
+from utils.llm_utils import (
+    MEDIUM_RISK_DELAY_HOURS, HIGH_RISK_DELAY_HOURS, HIGH_RISK_WEATHER
+)
+from utils.instrumentation import instrument
+
+TRIAGE_BATCH_SIZE = 50
+TRIAGE_TIME_BUDGET_SECONDS = 600
+RISK_LEVELS = ['Low', 'Medium', 'High']
+# gpt-4o list prices in USD per million tokens
+PROMPT_COST_PER_MTOK = 2.50
+COMPLETION_COST_PER_MTOK = 10.00
+
+TRIAGE_SYSTEM_PROMPT = (
+    "You are a logistics expert triaging shipments for delay risk. "
+    "You receive a JSON list of shipments and answer with a JSON object "
+    '{"results": [{"shipment_id": str, "risk_level": "Low"|"Medium"|"High", '
+    '"recommendation": str, "eta_confidence": number between 0 and 1}]} '
+    "containing exactly one result per input shipment."
+)
+
+TRIAGE_FIELDS = ['shipment_id', 'origin', 'destination', 'status', 'weather_condition', 'predicted_delay']
+
+def rule_based_risk_levels(shipment_data):
+    """Vectorized rule_based_risk_level over a whole DataFrame"""
+    delay = shipment_data['predicted_delay'].to_numpy()
+    severe_weather = shipment_data['weather_condition'].isin(HIGH_RISK_WEATHER).to_numpy()
+    return np.select(
+        [(delay > HIGH_RISK_DELAY_HOURS) | severe_weather, delay > MEDIUM_RISK_DELAY_HOURS],
+        ['High', 'Medium'],
+        default='Low'
+    )
+
+def _batch_messages(batch):
+    """Compact JSON prompt for one batch of shipments"""
+    records = batch[TRIAGE_FIELDS].assign(
+        predicted_delay=batch['predicted_delay'].round(1)
+    ).astype({'shipment_id': str}).to_dict('records')
+    return [
+        {"role": "system", "content": TRIAGE_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(records, separators=(',', ':'), default=str)}
+    ]
+
+def _validate_results(content, expected_ids):
+    """Parse a batch response, keeping only well-formed results for known shipments"""
+    results = json.loads(content).get('results', [])
+    valid = {}
+    for item in results if isinstance(results, list) else []:
+        if not isinstance(item, dict):
+            continue
+        shipment_id = str(item.get('shipment_id'))
+        risk_level = item.get('risk_level')
+        try:
+            confidence = float(item.get('eta_confidence'))
+        except (TypeError, ValueError):
+            continue
+        if shipment_id in expected_ids and risk_level in RISK_LEVELS and 0 <= confidence <= 1:
+            valid[shipment_id] = (risk_level, str(item.get('recommendation', '')), confidence)
+    return valid
+
+def _is_complete_reply(content, expected_ids):
+    """Whether a batch response has a valid result for every shipment; only these are cached"""
+    try:
+        return len(_validate_results(content, expected_ids)) == len(expected_ids)
+    except Exception:
+        return False
+
+async def _run_batches(client, batches, deadline):
+    return await asyncio.gather(
+        *(client.complete_with_usage(
+            _batch_messages(batch),
+            {"type": "json_object"},
+            deadline=deadline,
+            validate=partial(_is_complete_reply, expected_ids=set(batch['shipment_id'].astype(str)))
+        ) for batch in batches),
+        return_exceptions=True
+    )
+
+@instrument()
+def triage_shipments(shipment_data, batch_size=TRIAGE_BATCH_SIZE, time_budget=TRIAGE_TIME_BUDGET_SECONDS,
+                     client=None):
+    """Risk triage over a whole shipment table
+
+    Rule-based risk is computed for every row. Delivered and low-risk rows
+    keep the rule result; the rest are sent to the LLM in batched JSON
+    prompts, concurrently and within one deadline. Results that fail
+    validation fall back to the rule result.
+
+    Parameters:
+    - shipment_data: Shipment DataFrame, updated in place
+    - batch_size: Shipments per prompt
+    - time_budget: Seconds allowed for all LLM calls
+    - client: AsyncLLMClient, defaults to the process-wide client
+
+    Returns:
+    - shipment_data: With risk_level, recommendation, eta_confidence and
+      triage_source ('rules', 'llm' or 'fallback') columns
+    - metrics: Throughput and token cost of the run
+    """
+    start = time.perf_counter()
+    client = client or get_llm_client()
+
+    rule_levels = rule_based_risk_levels(shipment_data)
+    risk_level = rule_levels.astype(object)
+    recommendation = np.full(len(shipment_data), '', dtype=object)
+    eta_confidence = np.where(rule_levels == 'Low', 0.7, 0.4)
+    source = np.full(len(shipment_data), 'rules', dtype=object)
+
+    needs_llm = (rule_levels != 'Low') & (shipment_data['status'] != 'Delivered').to_numpy()
+    candidate_rows = np.flatnonzero(needs_llm)
+    batch_rows = [candidate_rows[i:i + batch_size] for i in range(0, len(candidate_rows), batch_size)]
+    batches = [shipment_data.iloc[rows] for rows in batch_rows]
+
+    responses = []
+    if batches:
+        deadline = time.monotonic() + time_budget
+        responses = client.submit(_run_batches(client, batches, deadline)).result()
+
+    prompt_tokens = completion_tokens = failed_batches = cached_batches = 0
+    for rows, batch, response in zip(batch_rows, batches, responses):
+        ids = batch['shipment_id'].astype(str).tolist()
+        try:
+            if isinstance(response, BaseException):
+                raise response
+            content, usage = response
+            results = _validate_results(content, set(ids))
+        except Exception:
+            failed_batches += 1
+            results = {}
+            usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'cached': False}
+
+        prompt_tokens += usage['prompt_tokens']
+        completion_tokens += usage['completion_tokens']
+        cached_batches += usage['cached']
+
+        for row, shipment_id in zip(rows, ids):
+            result = results.get(shipment_id)
+            if result is None:
+                source[row] = 'fallback'
+                continue
+            risk_level[row], recommendation[row], eta_confidence[row] = result
+            source[row] = 'llm'
+
+    shipment_data['risk_level'] = risk_level
+    shipment_data['recommendation'] = recommendation
+    shipment_data['eta_confidence'] = eta_confidence
+    shipment_data['triage_source'] = source
+
+    elapsed = time.perf_counter() - start
+    metrics = {
+        'rows': len(shipment_data),
+        'rule_only_rows': int((~needs_llm).sum()),
+        'llm_rows': len(candidate_rows),
+        'batches': len(batches),
+        'failed_batches': failed_batches,
+        'cached_batches': cached_batches,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': len(shipment_data) / elapsed if elapsed else float('inf'),
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'estimated_cost_usd': (
+            prompt_tokens * PROMPT_COST_PER_MTOK + completion_tokens * COMPLETION_COST_PER_MTOK
+        ) / 1e6
+    }
+    return shipment_data, metrics
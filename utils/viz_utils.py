@@ -1,25 +1,115 @@
-import plotly.express as px
-import plotly.graph_objects as go
-import folium
-
-def create_shipment_map(shipment_data):
-    """Create an interactive map with shipment routes"""
-    # Center the map on US
-    m = folium.Map(location=[39.8283, -98.5795], zoom_start=4)
-    
-    # Add shipment routes
-    for _, row in shipment_data.iterrows():
-        # Simple straight line between origin and destination
-        folium.PolyLine(
-            locations=[
-                get_city_coords(row['origin']),
-                get_city_coords(row['destination'])
-            ],
-            color='blue',
-            weight=2,
-            opacity=0.8
+import numpy as np
+import pandas as pd
+from utils.geo_utils import get_city_registry
+from utils.lazy_imports import lazy_import
+from utils.instrumentation import instrument
+
+# Plotting libraries load on first chart or map
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+folium = lazy_import('folium')
+folium_plugins = lazy_import('folium.plugins')
+
+MAP_CENTER = [39.8283, -98.5795]  # Continental US
+MAP_GEOJSON_THRESHOLD = 250  # Routes above which lines are drawn as one GeoJSON layer
+
+def aggregate_routes(shipment_data):
+    """One row per (origin, destination) with shipment count, mean delay and endpoint coordinates"""
+    registry = get_city_registry()
+    delays = (pd.to_numeric(shipment_data['predicted_delay'], errors='coerce')
+              if 'predicted_delay' in shipment_data else np.nan)
+    routes = pd.DataFrame({
+        'origin': shipment_data['origin'],
+        'destination': shipment_data['destination'],
+        'predicted_delay': delays
+    }).groupby(['origin', 'destination'], observed=True)['predicted_delay'].agg(
+        shipments='size', avg_delay='mean'
+    ).reset_index()
+
+    origin_ids = registry.city_ids(routes['origin'])
+    destination_ids = registry.city_ids(routes['destination'])
+    routes['origin_lat'] = registry.lat[origin_ids]
+    routes['origin_lon'] = registry.lon[origin_ids]
+    routes['destination_lat'] = registry.lat[destination_ids]
+    routes['destination_lon'] = registry.lon[destination_ids]
+    # Line width grows with the square root of volume, from 2 to 8 pixels
+    routes['weight'] = 2 + 6 * np.sqrt(routes['shipments'] / max(routes['shipments'].max(), 1))
+    return routes
+
+def _route_label(route):
+    delay = '' if pd.isna(route['avg_delay']) else f", avg delay {route['avg_delay']:.1f} h"
+    return f"{route['origin']} → {route['destination']}: {route['shipments']:,} shipments{delay}"
+
+def _routes_geojson(routes):
+    """Routes as a GeoJSON FeatureCollection of LineStrings"""
+    records = routes.to_dict('records')
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'LineString',
+                    'coordinates': [
+                        [route['origin_lon'], route['origin_lat']],
+                        [route['destination_lon'], route['destination_lat']]
+                    ]
+                },
+                'properties': {
+                    'label': _route_label(route),
+                    'weight': round(float(route['weight']), 1)
+                }
+            }
+            for route in records
+        ]
+    }
+
+@instrument()
+def create_shipment_map(shipment_data, geojson_threshold=MAP_GEOJSON_THRESHOLD):
+    """Create an interactive map with shipment routes
+
+    Shipments are aggregated into one line per (origin, destination),
+    weighted by volume, and cities are shown as clustered markers. Above
+    geojson_threshold routes the lines are a single GeoJSON layer, so the
+    payload grows with distinct routes rather than shipments.
+    """
+    m = folium.Map(location=MAP_CENTER, zoom_start=4)
+    routes = aggregate_routes(shipment_data)
+
+    if len(routes) > geojson_threshold:
+        folium.GeoJson(
+            _routes_geojson(routes),
+            name='Routes',
+            style_function=lambda feature: {
+                'color': 'blue',
+                'weight': feature['properties']['weight'],
+                'opacity': 0.6
+            },
+            tooltip=folium.GeoJsonTooltip(fields=['label'], labels=False)
         ).add_to(m)
-    
+    else:
+        for route in routes.to_dict('records'):
+            folium.PolyLine(
+                locations=[
+                    [route['origin_lat'], route['origin_lon']],
+                    [route['destination_lat'], route['destination_lon']]
+                ],
+                color='blue',
+                weight=route['weight'],
+                opacity=0.8,
+                tooltip=_route_label(route)
+            ).add_to(m)
+
+    # One clustered marker per city on any route
+    cities = pd.concat([
+        routes[['origin', 'origin_lat', 'origin_lon']].set_axis(['city', 'lat', 'lon'], axis=1),
+        routes[['destination', 'destination_lat', 'destination_lon']].set_axis(['city', 'lat', 'lon'], axis=1)
+    ]).astype({'city': str}).drop_duplicates('city')
+    if len(cities):
+        clusters = folium_plugins.MarkerCluster(name='Cities').add_to(m)
+        for city, lat, lon in cities.itertuples(index=False, name=None):
+            folium.Marker([lat, lon], popup=city).add_to(clusters)
+
     return m
 
 def create_delay_histogram(delays):
@@ -32,13 +122,17 @@ def create_delay_histogram(delays):
     )
     return fig
 
-def create_performance_timeline(data):
-    """Create timeline of shipping performance"""
+def create_performance_timeline(data, x='departure_time', y='predicted_delay'):
+    """Create timeline of shipping performance
+
+    data may be raw shipments or a pre-aggregated series such as a daily
+    cube rollup, with x and y naming its time and delay columns.
+    """
     fig = go.Figure()
     fig.add_trace(
         go.Scatter(
-            x=data['departure_time'],
-            y=data['predicted_delay'],
+            x=data[x],
+            y=data[y],
             mode='lines',
             name='Delay Trend'
         )
@@ -47,11 +141,4 @@ def create_performance_timeline(data):
 
 def get_city_coords(city):
     """Return approximate coordinates for major US cities"""
-    coords = {
-        'New York': [40.7128, -74.0060],
-        'Los Angeles': [34.0522, -118.2437],
-        'Chicago': [41.8781, -87.6298],
-        'Houston': [29.7604, -95.3698],
-        'Phoenix': [33.4484, -112.0740]
-    }
-    return coords.get(city, [39.8283, -98.5795])  # Default to US center
+    return get_city_registry().coords(city)  # Defaults to US center
@@ -0,0 +1,259 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.geo_utils import get_city_registry
+from utils.route_solver import solve_path
+from utils.instrumentation import instrument
+
+SAVINGS_NEIGHBORS = 40  # Savings pairs kept per stop
+SAVINGS_CHUNK_ROWS = 256
+AVERAGE_SPEED_KMH = 60
+
+def _top_savings(distances, depot_id, stop_ids, neighbors):
+    """Best Clarke-Wright savings pairs (i < j), sorted descending
+
+    Only the `neighbors` largest savings per stop are kept, computed in row
+    chunks so memory stays linear in the number of stops.
+    """
+    n = len(stop_ids)
+    k = min(neighbors, n - 1)
+    to_depot = distances[depot_id, stop_ids].astype(np.float64)
+    rows, cols, values = [], [], []
+
+    for start in range(0, n, SAVINGS_CHUNK_ROWS):
+        chunk = np.arange(start, min(start + SAVINGS_CHUNK_ROWS, n))
+        savings = (
+            to_depot[chunk, None] + to_depot[None, :]
+            - distances[np.ix_(stop_ids[chunk], stop_ids)]
+        )
+        savings[np.arange(len(chunk)), chunk] = -np.inf
+        best = np.argpartition(-savings, k - 1, axis=1)[:, :k]
+        rows.append(np.repeat(chunk, k))
+        cols.append(best.ravel())
+        values.append(np.take_along_axis(savings, best, axis=1).ravel())
+
+    rows, cols, values = map(np.concatenate, (rows, cols, values))
+    # A pair may be among the best of only one of its stops; keep it once
+    rows, cols = np.minimum(rows, cols), np.maximum(rows, cols)
+    _, first = np.unique(rows * n + cols, return_index=True)
+    rows, cols, values = rows[first], cols[first], values[first]
+    order = np.argsort(-values, kind='stable')
+    return rows[order], cols[order], values[order]
+
+def savings_routes(distances, depot_id, stop_ids, demands, capacity):
+    """Clarke-Wright savings construction
+
+    Parameters:
+    - distances: City distance matrix
+    - depot_id: City ID of the depot
+    - stop_ids: City ID of each stop
+    - demands: Demand of each stop
+    - capacity: Maximum load of a route
+
+    Returns:
+    - routes: List of stop index lists, each served depot -> stops -> depot
+    """
+    n = len(stop_ids)
+    if n == 0:
+        return []
+    if n == 1:
+        return [[0]]
+
+    routes = {i: [i] for i in range(n)}
+    route_of = np.arange(n)
+    loads = {i: float(demands[i]) for i in range(n)}
+
+    rows, cols, values = _top_savings(distances, depot_id, stop_ids, SAVINGS_NEIGHBORS)
+    for i, j, saving in zip(rows.tolist(), cols.tolist(), values.tolist()):
+        # Zero savings still merge, e.g. stops in the depot city; sorted, so
+        # every later saving is negative too
+        if saving < 0:
+            break
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj or loads[ri] + loads[rj] > capacity:
+            continue
+
+        route_i, route_j = routes[ri], routes[rj]
+        # Both stops must be route ends so the merge only adds edge (i, j)
+        if route_i[-1] == i:
+            pass
+        elif route_i[0] == i:
+            route_i.reverse()
+        else:
+            continue
+        if route_j[0] == j:
+            pass
+        elif route_j[-1] == j:
+            route_j.reverse()
+        else:
+            continue
+
+        route_i.extend(route_j)
+        route_of[route_j] = ri
+        loads[ri] += loads.pop(rj)
+        del routes[rj]
+
+    # Stops in the depot city add no distance next to the depot, so any left
+    # on their own join the fullest route that still has room
+    at_depot = distances[depot_id, stop_ids] == 0
+    for r in [r for r, route in routes.items() if len(route) == 1 and at_depot[route[0]]]:
+        if len(routes[r]) != 1:
+            continue  # Another singleton already joined it
+        room = [
+            other for other in routes
+            if other != r and loads[other] + loads[r] <= capacity
+        ]
+        if room:
+            target = max(room, key=lambda other: loads[other])
+            routes[target].insert(0, routes[r][0])
+            loads[target] += loads.pop(r)
+            del routes[r]
+
+    return list(routes.values())
+
+def _assign_vehicles(routes, loads, capacities):
+    """First-fit decreasing assignment of routes to vehicles
+
+    Returns a vehicle index (or None) per route.
+    """
+    vehicles = sorted(range(len(capacities)), key=lambda v: capacities[v])
+    assignment = [None] * len(routes)
+    for r in sorted(range(len(routes)), key=lambda r: -loads[r]):
+        for position, v in enumerate(vehicles):
+            if capacities[v] >= loads[r]:
+                assignment[r] = v
+                vehicles.pop(position)
+                break
+    return assignment
+
+def _insert_leftovers(distances, depot_id, stop_ids, demands, capacities, planned, leftovers):
+    """Repair pass for stops whose route got no vehicle
+
+    Each stop, largest demand first, goes where it adds the least distance
+    among routes whose vehicle still has room; when none has, it starts a
+    route on the largest unused vehicle it fits.
+
+    Parameters:
+    - planned: List of [vehicle, route, load], extended in place
+    - leftovers: Stop indexes to place
+
+    Returns:
+    - unplaced: Stop indexes that fit nowhere
+    """
+    used = {vehicle for vehicle, _, _ in planned}
+    spare = sorted((v for v in range(len(capacities)) if v not in used), key=lambda v: -capacities[v])
+    unplaced = []
+    for stop in sorted(leftovers, key=lambda s: -demands[s]):
+        city, demand = stop_ids[stop], demands[stop]
+        best, best_cost, best_position = None, np.inf, 0
+        for entry in planned:
+            vehicle, route, load = entry
+            if load + demand > capacities[vehicle]:
+                continue
+            path = np.concatenate([[depot_id], stop_ids[route], [depot_id]])
+            costs = distances[path[:-1], city] + distances[city, path[1:]] - distances[path[:-1], path[1:]]
+            position = int(np.argmin(costs))
+            if costs[position] < best_cost:
+                best, best_cost, best_position = entry, costs[position], position
+        if best is not None:
+            best[1].insert(best_position, stop)
+            best[2] += demand
+        elif spare and capacities[spare[0]] >= demand:
+            planned.append([spare.pop(0), [stop], demand])
+        else:
+            unplaced.append(stop)
+    return unplaced
+
+@instrument()
+def plan_fleet_routes(depot, vehicle_capacities, shipments, demand_column='demand',
+                      stop_column='destination', time_budget=2.0, max_workers=None):
+    """Capacitated multi-vehicle route planning from a single depot
+
+    Shipments are grouped into routes with the Clarke-Wright savings
+    heuristic, routes are given to vehicles largest load first, stops of
+    routes left without a vehicle are inserted where the fleet still has
+    room, and each route is then improved with 2-opt/Or-opt in a process
+    pool. The time left is split across the pool's waves of solves.
+
+    Parameters:
+    - depot: Depot city
+    - vehicle_capacities: Capacity of each vehicle
+    - shipments: DataFrame with one row per stop
+    - demand_column: Column holding each shipment's demand
+    - stop_column: Column holding each shipment's delivery city
+    - time_budget: Seconds allowed for the whole plan
+    - max_workers: Process pool size, defaults to the CPU count
+
+    Returns:
+    - plan: Dict with 'routes' (one dict per used vehicle), 'unassigned'
+      shipment index labels and 'total_distance_km'
+    """
+    deadline = time.perf_counter() + time_budget
+    registry = get_city_registry()
+    distances = registry.distance_matrix
+    depot_id = registry.city_id(depot)
+    stop_ids = registry.city_ids(shipments[stop_column])
+    demands = shipments[demand_column].to_numpy(dtype=np.float64)
+    capacities = list(vehicle_capacities)
+
+    oversized = demands > max(capacities, default=0)
+    servable = np.flatnonzero(~oversized)
+    routes = [
+        servable[route].tolist()
+        for route in savings_routes(
+            distances, depot_id, stop_ids[servable], demands[servable], max(capacities, default=0)
+        )
+    ]
+    loads = [float(demands[route].sum()) for route in routes]
+    assignment = _assign_vehicles(routes, loads, capacities)
+
+    planned, leftovers = [], []
+    for route, load, vehicle in zip(routes, loads, assignment):
+        if vehicle is None:
+            leftovers.extend(route)
+        else:
+            planned.append([vehicle, route, load])
+    # Routes were sized for the largest vehicle; the rest of the fleet takes their stops
+    unassigned = np.flatnonzero(oversized).tolist() + _insert_leftovers(
+        distances, depot_id, stop_ids, demands, capacities, planned, leftovers
+    )
+
+    # Route matrices are depot + stops + depot, so solve_path keeps the depot at both ends
+    route_matrices = [
+        distances[np.ix_(ids, ids)]
+        for ids in (
+            np.concatenate([[depot_id], stop_ids[route], [depot_id]])
+            for _, route, _ in planned
+        )
+    ]
+    remaining = max(deadline - time.perf_counter(), 0.0)
+    if len(planned) > 1 and remaining > 0:
+        workers = max_workers or os.cpu_count() or 1
+        waves = -(-len(route_matrices) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                solve_path, route_matrices, [remaining / waves] * len(route_matrices)
+            ))
+    else:
+        results = [solve_path(matrix, remaining / max(len(route_matrices), 1)) for matrix in route_matrices]
+
+    plan_routes = []
+    for (vehicle, route, load), (path, length) in zip(planned, results):
+        ordered = [route[i - 1] for i in path[1:-1]]
+        plan_routes.append({
+            'vehicle': vehicle,
+            'capacity': capacities[vehicle],
+            'load': load,
+            'shipments': shipments.index[ordered].tolist(),
+            'stops': shipments[stop_column].iloc[ordered].tolist(),
+            'distance_km': length,
+            'estimated_time': length / AVERAGE_SPEED_KMH
+        })
+    plan_routes.sort(key=lambda r: r['vehicle'])
+
+    return {
+        'routes': plan_routes,
+        'unassigned': shipments.index[sorted(unassigned)].tolist(),
+        'total_distance_km': float(sum(r['distance_km'] for r in plan_routes))
+    }
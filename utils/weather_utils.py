@@ -1,22 +1,209 @@
-import requests
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 import json
+from utils.lazy_imports import lazy_import
+from utils.instrumentation import incr, instrument, span
 
-def get_weather_data(city):
+requests = lazy_import('requests')
+
+WEATHER_TTL_SECONDS = 600
+WEATHER_MAX_WORKERS = 8
+WEATHER_TIMEOUT_SECONDS = 5
+DEFAULT_WEATHER = {'temp': 22, 'condition': 'Clear', 'humidity': 60}
+
+class WeatherProvider(ABC):
+    """Source of current weather for a city"""
+
+    @abstractmethod
+    def fetch(self, city):
+        """Return {'temp', 'condition', 'humidity'} for a city"""
+
+class StubWeatherProvider(WeatherProvider):
     """
-    Simulate weather API call (in production, replace with actual API call)
-    Currently providing mock data to demonstrate functionality
+    Offline provider with fixed mock data, used when no weather API is configured
     """
-    # Mock weather data based on city
-    weather_data = {
+    WEATHER_DATA = {
         'New York': {'temp': 20, 'condition': 'Clear', 'humidity': 65},
         'Los Angeles': {'temp': 25, 'condition': 'Sunny', 'humidity': 50},
         'Chicago': {'temp': 15, 'condition': 'Cloudy', 'humidity': 70},
         'Houston': {'temp': 30, 'condition': 'Rain', 'humidity': 75},
         'Phoenix': {'temp': 35, 'condition': 'Clear', 'humidity': 40}
     }
-    
-    return weather_data.get(city, {'temp': 22, 'condition': 'Clear', 'humidity': 60})
+
+    def __init__(self, weather_data=None, latency=0.0):
+        self.weather_data = weather_data if weather_data is not None else self.WEATHER_DATA
+        self.latency = latency
+        self.calls = 0
+
+    def fetch(self, city):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return dict(self.weather_data.get(city, DEFAULT_WEATHER))
+
+class HttpWeatherProvider(WeatherProvider):
+    """
+    Weather API client sharing one pooled HTTP session across threads.
+    Expects an OpenWeatherMap-style JSON response.
+    """
+
+    def __init__(self, base_url, api_key=None, timeout=WEATHER_TIMEOUT_SECONDS,
+                 pool_size=WEATHER_MAX_WORKERS):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, city):
+        params = {'q': city, 'units': 'metric'}
+        if self.api_key:
+            params['appid'] = self.api_key
+        response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return self.parse(response.json())
+
+    def parse(self, payload):
+        """Map the API payload onto the app's weather dict"""
+        return {
+            'temp': payload['main']['temp'],
+            'condition': payload['weather'][0]['main'],
+            'humidity': payload['main']['humidity']
+        }
+
+class WeatherService:
+    """
+    Per-city TTL cache in front of a provider. Concurrent requests for the
+    same city share one in-flight fetch, and batch lookups fetch the
+    distinct missing cities in parallel. Callers get their own copy of
+    each entry, so mutating one never changes the cache.
+    """
+
+    def __init__(self, provider, ttl=WEATHER_TTL_SECONDS, max_workers=WEATHER_MAX_WORKERS):
+        self.provider = provider
+        self.ttl = ttl
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='weather')
+
+    def _cached(self, city):
+        entry = self._entries.get(city)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _fetch(self, city, future):
+        try:
+            with span('weather_utils.provider_fetch'):
+                data = self.provider.fetch(city)
+        except Exception:
+            # Keep pages rendering when the API is down; don't cache the fallback
+            incr('weather.fetch_errors')
+            data = dict(DEFAULT_WEATHER)
+        else:
+            with self._lock:
+                self._entries[city] = (time.monotonic() + self.ttl, data)
+        finally:
+            with self._lock:
+                self._inflight.pop(city, None)
+        future.set_result(data)
+
+    def _claim(self, city):
+        """Return (cached data, pending future, whether this caller must fetch)"""
+        with self._lock:
+            data = self._cached(city)
+            if data is not None:
+                incr('weather.cache_hits')
+                return data, None, False
+            future = self._inflight.get(city)
+            if future is not None:
+                incr('weather.coalesced')
+                return None, future, False
+            incr('weather.cache_misses')
+            future = Future()
+            self._inflight[city] = future
+            return None, future, True
+
+    def get(self, city):
+        """Weather for one city"""
+        data, future, owner = self._claim(city)
+        if data is not None:
+            return dict(data)
+        if owner:
+            self._fetch(city, future)
+        return dict(future.result())
+
+    def get_many(self, cities):
+        """Weather for many cities, one fetch per distinct uncached city"""
+        results = {}
+        pending = {}
+        for city in dict.fromkeys(cities):
+            data, future, owner = self._claim(city)
+            if data is not None:
+                results[city] = dict(data)
+                continue
+            if owner:
+                self._executor.submit(self._fetch, city, future)
+            pending[city] = future
+
+        for city, future in pending.items():
+            results[city] = dict(future.result())
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self):
+        """Stop the fetch workers; fetches already running still finish"""
+        self._executor.shutdown(wait=False)
+
+_service = None
+_service_lock = threading.Lock()
+
+def _default_provider():
+    """HTTP provider when WEATHER_API_URL is set, otherwise the offline stub"""
+    base_url = os.environ.get('WEATHER_API_URL')
+    if base_url:
+        return HttpWeatherProvider(base_url, api_key=os.environ.get('WEATHER_API_KEY'))
+    return StubWeatherProvider()
+
+def get_weather_service():
+    """Process-wide weather service shared by every session"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = WeatherService(_default_provider())
+    return _service
+
+def set_weather_provider(provider, ttl=WEATHER_TTL_SECONDS):
+    """Swap the weather provider, e.g. for a stub in tests"""
+    global _service
+    with _service_lock:
+        previous = _service
+        _service = WeatherService(provider, ttl=ttl)
+    if previous is not None:
+        previous.shutdown()
+    return _service
+
+def get_weather_data(city):
+    """
+    Current weather for a city, served from the shared TTL cache
+    """
+    return get_weather_service().get(city)
+
+@instrument()
+def get_weather_for_cities(cities):
+    """Batch weather lookup keyed by city, fetching distinct cities concurrently"""
+    return get_weather_service().get_many(cities)
 
 def assess_weather_impact(weather_data):
     """Assess potential impact of weather on shipping"""
@@ -25,23 +212,31 @@ def assess_weather_impact(weather_data):
         'delay_probability': 0.1,
         'recommendations': []
     }
-    
+
     # Assess based on conditions
     if weather_data['condition'] in ['Rain', 'Snow', 'Storm']:
         impact['risk_level'] = 'High'
         impact['delay_probability'] = 0.7
         impact['recommendations'].append(f"Consider alternative routes due to {weather_data['condition']}")
-    
+
     if weather_data['temp'] > 35:
         impact['recommendations'].append("High temperature alert - ensure temperature-sensitive items are protected")
-    
+
     return impact
 
-def get_route_weather(origin, destination):
-    """Get weather data for entire shipping route"""
-    origin_weather = get_weather_data(origin)
-    dest_weather = get_weather_data(destination)
-    
+@instrument()
+def get_route_weather(origin, destination, weather=None):
+    """Get weather data for entire shipping route
+
+    weather is an optional mapping from get_weather_for_cities, so callers
+    rendering many shipments can prefetch once.
+    """
+    if weather is None:
+        weather = get_weather_for_cities([origin, destination])
+    # Copied, since a prefetched mapping is shared by every shipment of a page
+    origin_weather = dict(weather.get(origin) or get_weather_data(origin))
+    dest_weather = dict(weather.get(destination) or get_weather_data(destination))
+
     return {
         'origin': {'city': origin, 'weather': origin_weather},
         'destination': {'city': destination, 'weather': dest_weather},